@@ -1,4 +1,41 @@
-from typing import Union, Dict, Callable
+from typing import Union, Dict, Callable, List, Tuple, Sequence, Iterable, Iterator, TextIO
+import sys
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 16
+
+DIVISION_BY_ZERO = "Error: Division by zero"
+
+# Dictionary of supported operations
+OPERATIONS: Dict[str, Callable[[float, float], Union[float, bool, str]]] = {
+    '+': lambda x, y: round(x + y, 10),
+    '-': lambda x, y: round(x - y, 10),
+    '*': lambda x, y: round(x * y, 10),
+    '/': lambda x, y: round(x / y, 10) if y != 0 else DIVISION_BY_ZERO,
+    '<': lambda x, y: x < y,
+    '>': lambda x, y: x > y,
+    '<=': lambda x, y: x <= y,
+    '>=': lambda x, y: x >= y,
+    '!=': lambda x, y: x != y,
+    '==': lambda x, y: x == y
+}
+
+# Vectorized counterparts of OPERATIONS, applied to whole columns at once
+ARITHMETIC_UFUNCS: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+}
+
+COMPARISON_UFUNCS: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    '<': np.less,
+    '>': np.greater,
+    '<=': np.less_equal,
+    '>=': np.greater_equal,
+    '!=': np.not_equal,
+    '==': np.equal
+}
 
 
 def calculate(expression: str) -> Union[float, bool, str]:
@@ -30,27 +67,208 @@ def calculate(expression: str) -> Union[float, bool, str]:
     except ValueError:
         raise ValueError("Invalid numbers in expression")
 
-    # Dictionary of supported operations
-    operations: Dict[str, Callable[[float, float], Union[float, bool, str]]] = {
-        '+': lambda x, y: round(x + y, 10),
-        '-': lambda x, y: round(x - y, 10),
-        '*': lambda x, y: round(x * y, 10),
-        '/': lambda x, y: round(x / y, 10) if y != 0 else "Error: Division by zero",
-        '<': lambda x, y: x < y,
-        '>': lambda x, y: x > y,
-        '<=': lambda x, y: x <= y,
-        '>=': lambda x, y: x >= y,
-        '!=': lambda x, y: x != y,
-        '==': lambda x, y: x == y
-    }
-
-    if operator not in operations:
+    if operator not in OPERATIONS:
         raise ValueError(f"Unsupported operator: {operator}")
 
-    result = operations[operator](num_left, num_right)
+    result = OPERATIONS[operator](num_left, num_right)
     return result
 
 
+def tokenize_many(expressions: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split many expressions into left operand, operator and right operand columns.
+
+    Args:
+        expressions (Sequence[str]): Strings in format 'num_left operator num_right'.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Float array of left operands,
+            string array of operators and float array of right operands.
+
+    Raises:
+        ValueError: If any expression format is invalid or its numbers are invalid.
+    """
+    rows: List[List[str]] = [expression.split() for expression in expressions]
+
+    for row in rows:
+        if len(row) != 3:
+            raise ValueError(
+                "Invalid expression format. Expected: 'num_left operator num_right'")
+
+    if not rows:
+        return np.empty(0), np.empty(0, dtype=str), np.empty(0)
+
+    left_tokens, operators, right_tokens = zip(*rows)
+
+    try:
+        left = np.array(left_tokens, dtype=np.float64)
+        right = np.array(right_tokens, dtype=np.float64)
+    except ValueError:
+        raise ValueError("Invalid numbers in expression")
+
+    return left, np.array(operators), right
+
+
+def round_values(values: np.ndarray) -> np.ndarray:
+    """Round every value with round(value, 10), exactly as calculate does.
+
+    numpy.round scales by 10**10 first, which overflows for large values
+    and differs from round() in the last digit for some others.
+
+    Args:
+        values (np.ndarray): Float array.
+
+    Returns:
+        np.ndarray: Object array of rounded floats.
+    """
+    rounded = np.empty(values.shape, dtype=object)
+    rounded[:] = [round(value, 10) for value in values.tolist()]
+    return rounded
+
+
+def calculate_many(left: Sequence[float],
+                   operators: Union[str, Sequence[str]],
+                   right: Sequence[float]) -> np.ndarray:
+    """Calculate many expressions given as columns.
+
+    Element i of the result equals calculate(f"{left[i]} {operators[i]} {right[i]}").
+
+    Args:
+        left (Sequence[float]): Left operands.
+        operators (Union[str, Sequence[str]]): A single operator applied to every row,
+            or one operator per row.
+        right (Sequence[float]): Right operands.
+
+    Returns:
+        np.ndarray: Object array holding a float for arithmetic operations, a bool for
+            comparison operations, or an error message for division by zero.
+
+    Raises:
+        ValueError: If the columns have different lengths or an operator is not supported.
+    """
+    left = np.asarray(left, dtype=np.float64)
+    right = np.asarray(right, dtype=np.float64)
+    if left.shape != right.shape:
+        raise ValueError("Operand columns must have the same length")
+
+    if isinstance(operators, str):
+        if operators not in OPERATIONS:
+            raise ValueError(f"Unsupported operator: {operators}")
+        groups = {operators: slice(None)}
+    else:
+        operators = np.asarray(operators)
+        if operators.shape != left.shape:
+            raise ValueError("Operator column must have the same length as operands")
+        groups = {str(operator): operators == operator
+                  for operator in np.unique(operators)}
+        for operator in groups:
+            if operator not in OPERATIONS:
+                raise ValueError(f"Unsupported operator: {operator}")
+
+    result = np.empty(left.shape, dtype=object)
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        for operator, rows in groups.items():
+            x, y = left[rows], right[rows]
+
+            if operator in COMPARISON_UFUNCS:
+                result[rows] = COMPARISON_UFUNCS[operator](x, y).astype(object)
+                continue
+
+            if operator == '/':
+                zero = y == 0
+                values = round_values(np.divide(x, y, out=np.zeros_like(x), where=~zero))
+                values[zero] = DIVISION_BY_ZERO
+            else:
+                values = round_values(ARITHMETIC_UFUNCS[operator](x, y))
+            result[rows] = values
+
+    return result
+
+
+def read_lines(source: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Read lines from a text stream in large chunks.
+
+    Args:
+        source (TextIO): Stream to read from.
+        chunk_size (int): Number of characters read per call.
+
+    Yields:
+        str: Lines without trailing newline characters.
+    """
+    tail = ""
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split("\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def evaluate_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Evaluate every non-empty line and format its result.
+
+    A line that fails to evaluate yields an error message instead of
+    stopping the pipeline.
+
+    Args:
+        lines (Iterable[str]): Expressions in format 'num_left operator num_right'.
+
+    Yields:
+        str: The result of each expression or its error message.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield str(calculate(line))
+        except ValueError as e:
+            yield f"Error: {e}"
+        except Exception as e:
+            yield f"Unexpected error: {e}"
+
+
+def write_lines(lines: Iterable[str], sink: TextIO, batch_size: int = 4096) -> int:
+    """Write lines to a text stream in batches.
+
+    Args:
+        lines (Iterable[str]): Lines to write.
+        sink (TextIO): Stream to write to.
+        batch_size (int): Number of lines joined into a single write.
+
+    Returns:
+        int: Number of lines written.
+    """
+    count = 0
+    batch: List[str] = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            sink.write("\n".join(batch) + "\n")
+            count += len(batch)
+            batch.clear()
+    if batch:
+        sink.write("\n".join(batch) + "\n")
+        count += len(batch)
+    sink.flush()
+    return count
+
+
+def stream(source: TextIO, sink: TextIO) -> int:
+    """Evaluate expressions from source line by line and write results to sink.
+
+    Args:
+        source (TextIO): Stream of expressions, one per line.
+        sink (TextIO): Stream receiving one result or error message per expression.
+
+    Returns:
+        int: Number of expressions processed.
+    """
+    return write_lines(evaluate_lines(read_lines(source)), sink)
+
+
 def main() -> None:
     """Run the main calculator program loop.
 
@@ -71,6 +289,8 @@ def main() -> None:
             result = calculate(expression)
             print(f"Result: {result}")
 
+        except EOFError:
+            break
         except ValueError as e:
             print(f"Error: {e}")
         except Exception as e:
@@ -78,4 +298,11 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--stream":
+        if len(sys.argv) > 2:
+            with open(sys.argv[2], 'r', encoding='utf-8') as f:
+                stream(f, sys.stdout)
+        else:
+            stream(sys.stdin, sys.stdout)
+    else:
+        main()
@@ -1,31 +1,282 @@
-from typing import Dict, List, Union, Optional
+from typing import Dict, List, Union, Optional, Callable, Hashable, Set, Tuple, Iterator, NamedTuple
 from math import sin, log, sqrt, pow
 import re
+import sys
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
 from abc import ABC, abstractmethod
 
+import numpy as np
+
+
+CompiledExpression = Callable[[Dict[str, float]], float]
+
+# Values this large have no digits left to round at 10 decimal places,
+# and scaling them by 10**10 inside np.round would overflow.
+BATCH_ROUND_LIMIT = 1e15
+
+# Deeper trees are evaluated as a FlatExpression, since evaluate, the
+# Optimizer and the Profiler recurse once or twice per level.
+MAX_RECURSIVE_DEPTH = 200
+
+
+def round_batch(values: np.ndarray) -> np.ndarray:
+    """Round an array to 10 digits the way round(value, 10) does for scalars."""
+    return np.where(np.abs(values) < BATCH_ROUND_LIMIT, np.round(values, 10), values)
+
+
+def checked_log(value: float) -> float:
+    """Natural logarithm that rejects non-positive numbers."""
+    if value <= 0:
+        raise ValueError("Logarithm of non-positive number")
+    return log(value)
+
+
+def checked_sqrt(value: float) -> float:
+    """Square root that rejects negative numbers."""
+    if value < 0:
+        raise ValueError("Square root of negative number")
+    return sqrt(value)
+
+
+def batch_pow(args: List[np.ndarray], invalid: np.ndarray) -> np.ndarray:
+    base, exponent = args
+    result = np.power(base, exponent)
+    # math.pow raises where numpy returns nan or inf from finite inputs
+    invalid |= ~np.isfinite(result) & np.isfinite(base) & np.isfinite(exponent)
+    return result
+
+
+def batch_log(args: List[np.ndarray], invalid: np.ndarray) -> np.ndarray:
+    non_positive = args[0] <= 0
+    invalid |= non_positive
+    return np.log(np.where(non_positive, 1.0, args[0]))
+
+
+def batch_sin(args: List[np.ndarray], invalid: np.ndarray) -> np.ndarray:
+    invalid |= np.isinf(args[0])
+    return np.sin(args[0])
+
+
+def batch_sqrt(args: List[np.ndarray], invalid: np.ndarray) -> np.ndarray:
+    negative = args[0] < 0
+    invalid |= negative
+    return np.sqrt(np.where(negative, 0.0, args[0]))
+
+
+def batch_abs(args: List[np.ndarray], invalid: np.ndarray) -> np.ndarray:
+    return np.abs(args[0])
+
+
+class RegisteredFunction:
+    """Function that expressions can call, with its arity and optional memo cache.
+
+    Results are rounded to 10 digits like every other operation. Pure
+    functions with cache_size > 0 remember results of recent arguments.
+    """
+
+    __slots__ = ('name', 'implementation', 'arity', 'pure', 'batch',
+                 'cache', 'cache_size', 'hits', 'misses')
+
+    def __init__(self, name: str, implementation: Callable[..., float], arity: int,
+                 pure: bool = True, cache_size: int = 0,
+                 batch: Optional[Callable[[List[np.ndarray], np.ndarray], np.ndarray]] = None):
+        self.name = name
+        self.implementation = implementation
+        self.arity = arity
+        self.pure = pure
+        self.batch = batch
+        self.cache_size = cache_size
+        self.cache: Optional["OrderedDict[Tuple[float, ...], float]"] = (
+            OrderedDict() if pure and cache_size > 0 else None)
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, *args: float) -> float:
+        cache = self.cache
+        if cache is None:
+            return round(self.implementation(*args), 10)
+
+        if args in cache:
+            self.hits += 1
+            cache.move_to_end(args)
+            return cache[args]
+
+        self.misses += 1
+        value = round(self.implementation(*args), 10)
+        cache[args] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def evaluate_columns(self, args: List[np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        """Apply the function to columns, marking rows with domain errors in invalid."""
+        if self.batch is not None:
+            return round_batch(self.batch(args, invalid))
+
+        # No vectorized implementation: call it row by row
+        rows = [np.broadcast_to(arg, invalid.shape).ravel() for arg in args]
+        failed = invalid.reshape(-1)
+        result = np.zeros(failed.size)
+        for i in range(failed.size):
+            if failed[i]:
+                continue
+            try:
+                result[i] = self(*(float(row[i]) for row in rows))
+            except (ValueError, ArithmeticError):
+                failed[i] = True
+        invalid |= failed.reshape(invalid.shape)
+        return result.reshape(invalid.shape)
+
+
+class FunctionRegistry:
+    """Functions available to expressions, looked up by name."""
+
+    name_pattern = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
+
+    def __init__(self):
+        self.functions: Dict[str, RegisteredFunction] = {}
+        self.listeners: List[Callable[[], None]] = []
+
+    @classmethod
+    def with_builtins(cls) -> "FunctionRegistry":
+        """Create a registry holding pow, log, sin, sqrt and abs."""
+        registry = cls()
+        registry.register('pow', pow, 2, batch=batch_pow)
+        registry.register('log', checked_log, 1, batch=batch_log)
+        registry.register('sin', sin, 1, batch=batch_sin)
+        registry.register('sqrt', checked_sqrt, 1, batch=batch_sqrt)
+        registry.register('abs', abs, 1, batch=batch_abs)
+        return registry
+
+    def register(self, name: str, implementation: Callable[..., float], arity: int,
+                 pure: bool = True, cache_size: int = 0,
+                 batch: Optional[Callable[[List[np.ndarray], np.ndarray], np.ndarray]] = None
+                 ) -> RegisteredFunction:
+        """Add or replace a function.
+
+        Args:
+            name: Name used in expressions.
+            implementation: Callable taking arity floats and returning a float.
+                It should raise ValueError on invalid arguments.
+            arity: Number of arguments, checked when parsing.
+            pure: Whether the result depends only on the arguments. Impure
+                functions are never folded, shared or cached.
+            cache_size: Number of results a pure function remembers.
+            batch: Optional vectorized implementation for evaluate_batch.
+
+        Raises:
+            ValueError: If the name is not a valid identifier or arity is below 1.
+        """
+        if not self.name_pattern.fullmatch(name):
+            raise ValueError(f"Invalid function name: {name}")
+        if arity < 1:
+            raise ValueError(f"Function {name} must take at least one argument")
+        function = RegisteredFunction(name, implementation, arity, pure, cache_size, batch)
+        self.functions[name] = function
+        self.changed()
+        return function
+
+    def unregister(self, name: str) -> None:
+        """Remove a function."""
+        del self.functions[name]
+        self.changed()
+
+    def get(self, name: str) -> Optional[RegisteredFunction]:
+        return self.functions.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.functions
+
+    def __getstate__(self) -> Dict[str, RegisteredFunction]:
+        # Listeners belong to this process and are not sent to workers
+        return self.functions
+
+    def __setstate__(self, functions: Dict[str, RegisteredFunction]) -> None:
+        self.functions = functions
+        self.listeners = []
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Call callback whenever the set of functions changes."""
+        self.listeners.append(callback)
+
+    def changed(self) -> None:
+        for listener in self.listeners:
+            listener()
+
+
+BUILTIN_FUNCTIONS = FunctionRegistry.with_builtins()
+
 
 class Expression(ABC):
     """Abstract base class for all expressions."""
 
+    __slots__ = ()
+
     @abstractmethod
     def evaluate(self, variables: Dict[str, float]) -> float:
         """Evaluate the expression with given variables."""
         pass
 
+    def compile(self) -> CompiledExpression:
+        """Compile the expression into a function of variables.
+
+        The returned function gives the same results and raises the same
+        errors as evaluate, without walking the tree on every call; see
+        generate_function.
+        """
+        return generate_function(self)
+
+    def evaluate_batch(self, columns: Dict[str, np.ndarray]) -> np.ma.MaskedArray:
+        """Evaluate the expression for every row of the given variable columns.
+
+        Rows hitting a domain error (division by zero, logarithm of a
+        non-positive number, square root of a negative number) are masked
+        instead of raising. An undefined variable still raises ValueError.
+        Rounding uses np.round, which may differ from round() in the last
+        digit for values lying on a rounding boundary.
+        """
+        columns = {name: np.asarray(column, dtype=np.float64)
+                   for name, column in columns.items()}
+        shape = np.broadcast_shapes(*(column.shape for column in columns.values()))
+        invalid = np.zeros(shape, dtype=bool)
+        with np.errstate(all='ignore'):
+            values = self.evaluate_columns(columns, invalid)
+        return np.ma.masked_array(np.broadcast_to(values, shape).copy(), mask=invalid)
+
+    @abstractmethod
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        """Evaluate the expression over columns, marking rows with domain errors in invalid."""
+        pass
+
+    def children(self) -> List["Expression"]:
+        """Return the direct subexpressions."""
+        return []
+
 
 class Number(Expression):
     """Represents a numeric constant."""
 
+    __slots__ = ('value',)
+
     def __init__(self, value: float):
         self.value = value
 
     def evaluate(self, variables: Dict[str, float]) -> float:
         return self.value
 
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        return np.float64(self.value)
+
 
 class Variable(Expression):
     """Represents a variable."""
 
+    __slots__ = ('name',)
+
     def __init__(self, name: str):
         self.name = name
 
@@ -34,10 +285,17 @@ class Variable(Expression):
             raise ValueError(f"Undefined variable: {self.name}")
         return variables[self.name]
 
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        if self.name not in columns:
+            raise ValueError(f"Undefined variable: {self.name}")
+        return columns[self.name]
+
 
 class BinaryOperation(Expression):
     """Represents a binary operation (+, -, *, /)."""
 
+    __slots__ = ('left', 'operator', 'right')
+
     def __init__(self, left: Expression, operator: str, right: Expression):
         self.left = left
         self.operator = operator
@@ -60,40 +318,68 @@ class BinaryOperation(Expression):
         else:
             raise ValueError(f"Unknown operator: {self.operator}")
 
+    def children(self) -> List[Expression]:
+        return [self.left, self.right]
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        left_val = self.left.evaluate_columns(columns, invalid)
+        right_val = self.right.evaluate_columns(columns, invalid)
+
+        if self.operator == '+':
+            return round_batch(left_val + right_val)
+        elif self.operator == '-':
+            return round_batch(left_val - right_val)
+        elif self.operator == '*':
+            return round_batch(left_val * right_val)
+        elif self.operator == '/':
+            zero = right_val == 0
+            invalid |= zero
+            return round_batch(left_val / np.where(zero, 1.0, right_val))
+        else:
+            raise ValueError(f"Unknown operator: {self.operator}")
+
 
 class Function(Expression):
-    """Represents a function call (pow, log, sin, sqrt, abs)."""
+    """Represents a call of a registered function (pow, log, sin, sqrt, abs, ...)."""
+
+    __slots__ = ('name', 'args', 'function')
 
-    def __init__(self, name: str, args: List[Expression]):
+    def __init__(self, name: str, args: List[Expression],
+                 function: Optional[RegisteredFunction] = None):
         self.name = name
         self.args = args
+        self.function = function if function is not None else BUILTIN_FUNCTIONS.get(name)
 
     def evaluate(self, variables: Dict[str, float]) -> float:
-        if self.name == 'pow' and len(self.args) == 2:
-            return round(pow(self.args[0].evaluate(variables),
-                             self.args[1].evaluate(variables)), 10)
-        elif self.name == 'log' and len(self.args) == 1:
-            arg = self.args[0].evaluate(variables)
-            if arg <= 0:
-                raise ValueError("Logarithm of non-positive number")
-            return round(log(arg), 10)
-        elif self.name == 'sin' and len(self.args) == 1:
-            return round(sin(self.args[0].evaluate(variables)), 10)
-        elif self.name == 'sqrt' and len(self.args) == 1:
-            arg = self.args[0].evaluate(variables)
-            if arg < 0:
-                raise ValueError("Square root of negative number")
-            return round(sqrt(arg), 10)
-        elif self.name == 'abs' and len(self.args) == 1:
-            return round(abs(self.args[0].evaluate(variables)), 10)
-        else:
+        function = self.function
+        args = self.args
+        if function is None or function.arity != len(args):
+            raise ValueError(
+                f"Unknown function or wrong number of arguments: {self.name}")
+        if function.cache is None:
+            # Uncached functions skip the memo lookup in RegisteredFunction.__call__
+            if len(args) == 1:
+                return round(function.implementation(args[0].evaluate(variables)), 10)
+            return round(function.implementation(*[arg.evaluate(variables) for arg in args]), 10)
+        return function(*[arg.evaluate(variables) for arg in args])
+
+    def children(self) -> List[Expression]:
+        return list(self.args)
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        function = self.function
+        if function is None or function.arity != len(self.args):
             raise ValueError(
                 f"Unknown function or wrong number of arguments: {self.name}")
+        args = [arg.evaluate_columns(columns, invalid) for arg in self.args]
+        return function.evaluate_columns(args, invalid)
 
 
 class Assignment(Expression):
     """Represents a variable assignment."""
 
+    __slots__ = ('variable', 'expression')
+
     def __init__(self, variable: str, expression: Expression):
         self.variable = variable
         self.expression = expression
@@ -103,104 +389,1361 @@ class Assignment(Expression):
         variables[self.variable] = value
         return value
 
+    def children(self) -> List[Expression]:
+        return [self.expression]
 
-class Parser:
-    """Parser for mathematical expressions."""
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        values = self.expression.evaluate_columns(columns, invalid)
+        columns[self.variable] = values
+        return values
+
+
+class Shared(Expression):
+    """Represents a subexpression referenced from several places.
+
+    It is evaluated on first use and the value is reused for the rest of
+    the evaluation, so errors are raised at the same point as without
+    sharing. The enclosing SharedScope resets it before every evaluation,
+    therefore one tree must not be evaluated from several threads at once.
+    """
+
+    __slots__ = ('expression', 'slot')
+
+    def __init__(self, expression: Expression):
+        self.expression = expression
+        self.slot: List = [False, None]
+
+    def evaluate(self, variables: Dict[str, float]) -> float:
+        slot = self.slot
+        if not slot[0]:
+            slot[1] = self.expression.evaluate(variables)
+            slot[0] = True
+        return slot[1]
+
+    def children(self) -> List[Expression]:
+        return [self.expression]
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        slot = self.slot
+        if not slot[0]:
+            slot[1] = self.expression.evaluate_columns(columns, invalid)
+            slot[0] = True
+        return slot[1]
+
+
+class SharedScope(Expression):
+    """Root of an expression containing shared subexpressions."""
+
+    __slots__ = ('expression', 'shared')
+
+    def __init__(self, expression: Expression, shared: List[Shared]):
+        self.expression = expression
+        self.shared = shared
+
+    def reset(self) -> None:
+        """Forget values of shared subexpressions from the previous evaluation."""
+        for node in self.shared:
+            node.slot[0] = False
+
+    def evaluate(self, variables: Dict[str, float]) -> float:
+        self.reset()
+        return self.expression.evaluate(variables)
+
+    def children(self) -> List[Expression]:
+        return [self.expression]
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        self.reset()
+        return self.expression.evaluate_columns(columns, invalid)
+
+
+def count_nodes(expression: Expression) -> int:
+    """Count distinct nodes of an expression, not counting sharing wrappers."""
+    seen: Set[int] = set()
+    count = 0
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if not isinstance(node, (Shared, SharedScope, Flattened)):
+            count += 1
+        stack.extend(node.children())
+    return count
+
+
+def generate_function(expression: Expression) -> CompiledExpression:
+    """Compile an expression into a generated Python function of variables.
+
+    The tree is turned into straight-line source code with one local
+    variable per node, so a call does no tree walking, dispatch or
+    closure calls. Every result is rounded and every error raised exactly
+    as in evaluate. A shared subexpression is computed once per call.
+    Nodes of other types, such as Profiled, are called through their
+    evaluate method. The tree is walked without recursion, so deep
+    expressions compile as well.
+    """
+    lines: List[str] = []
+    # Objects the generated code refers to, passed in as closure variables
+    constants: List[object] = []
+    values: List[str] = []
+    shared: Dict[int, str] = {}
+    temporaries = 0
+
+    def constant(value: object) -> str:
+        constants.append(value)
+        return f"c{len(constants) - 1}"
+
+    def temporary() -> str:
+        nonlocal temporaries
+        temporaries += 1
+        return f"t{temporaries}"
+
+    stack: List[Tuple[Expression, bool]] = [(expression, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if isinstance(node, SharedScope):
+            # Reset slots for Shared nodes evaluated through evaluate()
+            for shared_node in node.shared:
+                lines.append(f"{constant(shared_node.slot)}[0] = False")
+            stack.append((node.expression, False))
+            continue
+        if isinstance(node, Shared):
+            if id(node) in shared:
+                values.append(shared[id(node)])
+            elif expanded:
+                shared[id(node)] = values[-1]
+            else:
+                stack.append((node, True))
+                stack.append((node.expression, False))
+            continue
+        if isinstance(node, Function) and (node.function is None
+                                           or node.function.arity != len(node.args)):
+            # Fails before evaluating its arguments, like Function.evaluate
+            message = f"Unknown function or wrong number of arguments: {node.name}"
+            lines.append(f"raise ValueError({message!r})")
+            values.append("None")
+            continue
+        if isinstance(node, (BinaryOperation, Function, Assignment)) and not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children()))
+            continue
+
+        result = temporary()
+        if isinstance(node, Number):
+            lines.append(f"{result} = {constant(node.value)}")
+        elif isinstance(node, Variable):
+            lines.append("try:")
+            lines.append(f"    {result} = variables[{node.name!r}]")
+            lines.append("except KeyError:")
+            lines.append(f"    raise ValueError({'Undefined variable: ' + node.name!r}) from None")
+        elif isinstance(node, BinaryOperation):
+            right = values.pop()
+            left = values.pop()
+            if node.operator in ('+', '-', '*'):
+                lines.append(f"{result} = round_({left} {node.operator} {right}, 10)")
+            elif node.operator == '/':
+                lines.append(f"if {right} == 0:")
+                lines.append("    raise ValueError('Division by zero')")
+                lines.append(f"{result} = round_({left} / {right}, 10)")
+            else:
+                lines.append(f"raise ValueError({'Unknown operator: ' + node.operator!r})")
+        elif isinstance(node, Function):
+            args = values[len(values) - len(node.args):]
+            del values[len(values) - len(node.args):]
+            function = node.function
+            if function.cache is None:
+                # Uncached functions skip the memo lookup in RegisteredFunction.__call__
+                call = f"{constant(function.implementation)}({', '.join(args)})"
+                lines.append(f"{result} = round_({call}, 10)")
+            else:
+                lines.append(f"{result} = {constant(function)}({', '.join(args)})")
+        elif isinstance(node, Assignment):
+            value = values.pop()
+            lines.append(f"variables[{node.variable!r}] = {value}")
+            lines.append(f"{result} = {value}")
+        else:
+            lines.append(f"{result} = {constant(node)}.evaluate(variables)")
+        values.append(result)
+
+    lines.append(f"return {values[-1]}")
+    names = ", ".join(["round_"] + [f"c{i}" for i in range(len(constants))])
+    source = (f"def make({names}):\n"
+              f"    def compiled(variables):\n"
+              + "".join(f"        {line}\n" for line in lines)
+              + "    return compiled\n")
+    namespace: Dict[str, Callable] = {}
+    exec(source, namespace)
+    return namespace['make'](round, *constants)
+
+
+class Optimizer:
+    """Constant folding and common-subexpression elimination for expressions."""
 
     def __init__(self):
-        self.tokens = []
-        self.current = 0
+        self.nodes_before = 0
+        self.nodes_after = 0
+
+    def optimize(self, expression: Expression) -> Expression:
+        """Return an equivalent expression that does less work per evaluation."""
+        self.nodes_before = count_nodes(expression)
+        result = self.fold(expression)
+        if not self.has_nested_assignment(result):
+            result = self.share(result)
+        self.nodes_after = count_nodes(result)
+        return result
+
+    def fold(self, expression: Expression) -> Expression:
+        """Replace subtrees without variables by their value.
+
+        Subtrees that fail to evaluate, such as 1/0, are kept so the error
+        is still raised at evaluation time.
+        """
+        if isinstance(expression, BinaryOperation):
+            node: Expression = BinaryOperation(self.fold(expression.left), expression.operator,
+                                               self.fold(expression.right))
+        elif isinstance(expression, Function):
+            node = Function(expression.name, [self.fold(arg) for arg in expression.args],
+                            expression.function)
+            if node.function is None or not node.function.pure:
+                return node
+        elif isinstance(expression, Assignment):
+            return Assignment(expression.variable, self.fold(expression.expression))
+        else:
+            return expression
+
+        if all(isinstance(child, Number) for child in node.children()):
+            try:
+                return Number(node.evaluate({}))
+            except (ValueError, ArithmeticError):
+                pass
+        return node
+
+    @staticmethod
+    def has_nested_assignment(expression: Expression) -> bool:
+        """Check for assignments below the root, which make variables change mid-evaluation."""
+        stack = list(expression.children())
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Assignment):
+                return True
+            stack.extend(node.children())
+        return False
+
+    def share(self, expression: Expression) -> Expression:
+        """Make identical operation and pure function subtrees a single Shared node."""
+        keys: Dict[int, Hashable] = {}
+        occurrences: Dict[Hashable, int] = {}
+
+        def key(node: Expression) -> Hashable:
+            if id(node) not in keys:
+                if isinstance(node, Number):
+                    keys[id(node)] = ('number', node.value, str(node.value))
+                elif isinstance(node, Variable):
+                    keys[id(node)] = ('variable', node.name)
+                elif isinstance(node, BinaryOperation):
+                    keys[id(node)] = ('operation', node.operator, key(node.left), key(node.right))
+                elif (isinstance(node, Function) and node.function is not None
+                      and node.function.pure):
+                    keys[id(node)] = ('function', node.name,
+                                      tuple(key(arg) for arg in node.args))
+                else:
+                    keys[id(node)] = ('node', id(node))
+            return keys[id(node)]
+
+        def count(node: Expression) -> None:
+            node_key = key(node)
+            occurrences[node_key] = occurrences.get(node_key, 0) + 1
+            if occurrences[node_key] == 1:
+                for child in node.children():
+                    count(child)
+
+        count(expression)
+
+        shared: Dict[Hashable, Shared] = {}
+
+        def rebuild(node: Expression) -> Expression:
+            node_key = key(node)
+            if node_key in shared:
+                return shared[node_key]
+
+            if isinstance(node, BinaryOperation):
+                result: Expression = BinaryOperation(rebuild(node.left), node.operator,
+                                                     rebuild(node.right))
+            elif isinstance(node, Function):
+                result = Function(node.name, [rebuild(arg) for arg in node.args], node.function)
+            elif isinstance(node, Assignment):
+                return Assignment(node.variable, rebuild(node.expression))
+            else:
+                return node
+
+            if occurrences[node_key] > 1:
+                result = shared[node_key] = Shared(result)
+            return result
+
+        result = rebuild(expression)
+        if not shared:
+            return result
+        return SharedScope(result, list(shared.values()))
+
+
+# Instructions of a FlatExpression
+(OP_NUMBER, OP_VARIABLE, OP_ADD, OP_SUBTRACT, OP_MULTIPLY, OP_DIVIDE,
+ OP_CALL, OP_FAIL, OP_ASSIGN) = range(9)
+
+BINARY_OPCODES = {'+': OP_ADD, '-': OP_SUBTRACT, '*': OP_MULTIPLY, '/': OP_DIVIDE}
+
+
+class FlatExpression:
+    """Compact postfix form of an expression.
+
+    The whole formula is stored as parallel arrays of opcodes and operand
+    indexes plus tables of constants and names, and is evaluated by a loop
+    over a value stack, without recursion. Results and errors are the same
+    as for the tree it was built from.
+    """
+
+    __slots__ = ('code', 'operands', 'constants', 'names', 'functions')
+
+    def __init__(self, code: array, operands: array, constants: array, names: Tuple[str, ...],
+                 functions: Tuple[RegisteredFunction, ...] = ()):
+        self.code = code
+        self.operands = operands
+        self.constants = constants
+        self.names = names
+        self.functions = functions
+
+    @classmethod
+    def from_expression(cls, expression: Expression) -> "FlatExpression":
+        """Flatten an expression tree; shared subexpressions are inlined."""
+        code = array('B')
+        operands = array('l')
+        constants = array('d')
+        names: List[str] = []
+        name_index: Dict[str, int] = {}
+        functions: List[RegisteredFunction] = []
+        function_index: Dict[int, int] = {}
+
+        def name(text: str) -> int:
+            if text not in name_index:
+                name_index[text] = len(names)
+                names.append(text)
+            return name_index[text]
+
+        def function(registered: RegisteredFunction) -> int:
+            if id(registered) not in function_index:
+                function_index[id(registered)] = len(functions)
+                functions.append(registered)
+            return function_index[id(registered)]
+
+        stack: List[Tuple[Expression, bool]] = [(expression, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if isinstance(node, (Shared, SharedScope, Flattened)):
+                stack.append((node.expression, False))
+                continue
+            if isinstance(node, Function) and (node.function is None
+                                               or node.function.arity != len(node.args)):
+                # Fails before evaluating its arguments, like Function.evaluate
+                code.append(OP_FAIL)
+                operands.append(name(node.name))
+                continue
+            children = node.children()
+            if children and not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+
+            if isinstance(node, Number):
+                code.append(OP_NUMBER)
+                operands.append(len(constants))
+                constants.append(node.value)
+            elif isinstance(node, Variable):
+                code.append(OP_VARIABLE)
+                operands.append(name(node.name))
+            elif isinstance(node, BinaryOperation):
+                if node.operator not in BINARY_OPCODES:
+                    raise ValueError(f"Unknown operator: {node.operator}")
+                code.append(BINARY_OPCODES[node.operator])
+                operands.append(0)
+            elif isinstance(node, Function):
+                code.append(OP_CALL)
+                operands.append(function(node.function))
+            elif isinstance(node, Assignment):
+                code.append(OP_ASSIGN)
+                operands.append(name(node.variable))
+            else:
+                raise ValueError(f"Cannot flatten {type(node).__name__}")
+
+        return cls(code, operands, constants, tuple(names), tuple(functions))
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def evaluate(self, variables: Dict[str, float]) -> float:
+        """Evaluate the expression with given variables."""
+        constants = self.constants
+        names = self.names
+        functions = self.functions
+        stack: List[float] = []
+        push = stack.append
+        pop = stack.pop
+
+        for opcode, operand in zip(self.code, self.operands):
+            if opcode == OP_NUMBER:
+                push(constants[operand])
+            elif opcode == OP_VARIABLE:
+                name = names[operand]
+                if name not in variables:
+                    raise ValueError(f"Undefined variable: {name}")
+                push(variables[name])
+            elif opcode == OP_ADD:
+                right = pop()
+                stack[-1] = round(stack[-1] + right, 10)
+            elif opcode == OP_SUBTRACT:
+                right = pop()
+                stack[-1] = round(stack[-1] - right, 10)
+            elif opcode == OP_MULTIPLY:
+                right = pop()
+                stack[-1] = round(stack[-1] * right, 10)
+            elif opcode == OP_DIVIDE:
+                right = pop()
+                if right == 0:
+                    raise ValueError("Division by zero")
+                stack[-1] = round(stack[-1] / right, 10)
+            elif opcode == OP_CALL:
+                function = functions[operand]
+                count = function.arity
+                args = stack[-count:]
+                del stack[-count:]
+                push(function(*args))
+            elif opcode == OP_ASSIGN:
+                variables[names[operand]] = stack[-1]
+            else:
+                raise ValueError(
+                    f"Unknown function or wrong number of arguments: {names[operand]}")
+        return stack[-1]
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        """Evaluate the expression over columns like Expression.evaluate_columns, without recursion."""
+        constants = self.constants
+        names = self.names
+        functions = self.functions
+        stack: List[np.ndarray] = []
+        push = stack.append
+        pop = stack.pop
+
+        for opcode, operand in zip(self.code, self.operands):
+            if opcode == OP_NUMBER:
+                push(np.float64(constants[operand]))
+            elif opcode == OP_VARIABLE:
+                name = names[operand]
+                if name not in columns:
+                    raise ValueError(f"Undefined variable: {name}")
+                push(columns[name])
+            elif opcode == OP_ADD:
+                right = pop()
+                stack[-1] = round_batch(stack[-1] + right)
+            elif opcode == OP_SUBTRACT:
+                right = pop()
+                stack[-1] = round_batch(stack[-1] - right)
+            elif opcode == OP_MULTIPLY:
+                right = pop()
+                stack[-1] = round_batch(stack[-1] * right)
+            elif opcode == OP_DIVIDE:
+                right = pop()
+                zero = right == 0
+                invalid |= zero
+                stack[-1] = round_batch(stack[-1] / np.where(zero, 1.0, right))
+            elif opcode == OP_CALL:
+                function = functions[operand]
+                count = function.arity
+                args = stack[-count:]
+                del stack[-count:]
+                push(function.evaluate_columns(args, invalid))
+            elif opcode == OP_ASSIGN:
+                columns[names[operand]] = stack[-1]
+            else:
+                raise ValueError(
+                    f"Unknown function or wrong number of arguments: {names[operand]}")
+        return stack[-1]
+
+
+class Flattened(Expression):
+    """Expression too deep to evaluate recursively, evaluated as a FlatExpression.
+
+    The parser wraps trees deeper than MAX_RECURSIVE_DEPTH in it instead of
+    optimizing them. The flat form is built on first evaluation, for
+    single values and columns alike. Tree walkers see the original tree
+    as its only child.
+    """
+
+    __slots__ = ('expression', 'flat')
+
+    def __init__(self, expression: Expression):
+        self.expression = expression
+        self.flat: Optional[FlatExpression] = None
+
+    def flatten(self) -> FlatExpression:
+        """Return the flat form, building it on first use."""
+        if self.flat is None:
+            self.flat = FlatExpression.from_expression(self.expression)
+        return self.flat
+
+    def evaluate(self, variables: Dict[str, float]) -> float:
+        return self.flatten().evaluate(variables)
+
+    def children(self) -> List[Expression]:
+        return [self.expression]
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        return self.flatten().evaluate_columns(columns, invalid)
+
+
+def deeper_than(expression: Expression, limit: int) -> bool:
+    """Return whether the longest path from the root has more than limit nodes."""
+    stack = [(expression, 1)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node, level = pop()
+        if level > limit:
+            return True
+        level += 1
+        # Left operands first: long chains of binary operators lean left
+        for child in reversed(node.children()):
+            push((child, level))
+    return False
+
+
+class Profiled(Expression):
+    """Wrapper recording how often a node is evaluated and the time spent in it."""
+
+    __slots__ = ('expression', 'stats')
+
+    def __init__(self, expression: Expression, stats: List):
+        self.expression = expression
+        self.stats = stats
+
+    def evaluate(self, variables: Dict[str, float]) -> float:
+        stats = self.stats
+        start = perf_counter()
+        try:
+            return self.expression.evaluate(variables)
+        finally:
+            stats[0] += 1
+            stats[1] += perf_counter() - start
+
+    def children(self) -> List[Expression]:
+        return [self.expression]
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], invalid: np.ndarray) -> np.ndarray:
+        stats = self.stats
+        start = perf_counter()
+        try:
+            return self.expression.evaluate_columns(columns, invalid)
+        finally:
+            stats[0] += 1
+            stats[1] += perf_counter() - start
+
+
+class Profiler:
+    """Call counts and cumulative time per node, per function and per phase.
+
+    instrument() returns a copy of a tree with every node wrapped in
+    Profiled; trees that are not instrumented run without any overhead.
+    Nodes are identified by their path of labels from the statement, so
+    statistics of equal paths are merged as in a flame graph. A shared
+    subexpression is attributed to its first occurrence. Instrumented
+    copies of the last maxsize trees are reused, like a ParseCache of the
+    same size keeps their originals.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        # Path of labels -> [calls, seconds]
+        self.nodes: Dict[Tuple[str, ...], List] = {}
+        self.function_paths: Dict[str, Set[Tuple[str, ...]]] = {}
+        self.phases: Dict[str, List] = {}
+        self.maxsize = maxsize
+        self.trees: "OrderedDict[int, Tuple[Expression, Expression]]" = OrderedDict()
+
+    @staticmethod
+    def label(node: Expression) -> str:
+        """Return the frame name of a node."""
+        if isinstance(node, Number):
+            return 'number'
+        if isinstance(node, Variable):
+            return node.name
+        if isinstance(node, BinaryOperation):
+            return node.operator
+        if isinstance(node, Function):
+            return node.name
+        if isinstance(node, Assignment):
+            return f"{node.variable} ="
+        return type(node).__name__
+
+    def instrument(self, expression: Expression, statement: str) -> Expression:
+        """Return an instrumented copy of expression, recorded under the statement text."""
+        entry = self.trees.get(id(expression))
+        if entry is not None:
+            self.trees.move_to_end(id(expression))
+            return entry[1]
+
+        shared: Dict[int, Shared] = {}
+
+        def wrap(node: Expression, path: Tuple[str, ...]) -> Expression:
+            if isinstance(node, SharedScope):
+                inner = wrap(node.expression, path)
+                return SharedScope(inner, [shared[id(s)] for s in node.shared if id(s) in shared])
+            if isinstance(node, Shared):
+                if id(node) not in shared:
+                    shared[id(node)] = Shared(wrap(node.expression, path))
+                return shared[id(node)]
+
+            key = path + (self.label(node),)
+            if isinstance(node, BinaryOperation):
+                result: Expression = BinaryOperation(wrap(node.left, key), node.operator,
+                                                     wrap(node.right, key))
+            elif isinstance(node, Function):
+                result = Function(node.name, [wrap(arg, key) for arg in node.args],
+                                  node.function)
+                self.function_paths.setdefault(node.name, set()).add(key)
+            elif isinstance(node, Assignment):
+                result = Assignment(node.variable, wrap(node.expression, key))
+            else:
+                result = node
+            return Profiled(result, self.nodes.setdefault(key, [0, 0.0]))
+
+        instrumented = wrap(expression, (statement.replace(';', ','),))
+        if self.maxsize > 0:
+            # Keep the original alive so its id is not reused
+            self.trees[id(expression)] = (expression, instrumented)
+            if len(self.trees) > self.maxsize:
+                self.trees.popitem(last=False)
+        return instrumented
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """Add the time spent in the with block to a phase such as 'parse'."""
+        stats = self.phases.setdefault(phase, [0, 0.0])
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            stats[0] += 1
+            stats[1] += perf_counter() - start
+
+    def self_times(self) -> Dict[Tuple[str, ...], float]:
+        """Return the time spent in each path excluding its children."""
+        times = {path: stats[1] for path, stats in self.nodes.items()}
+        for path, stats in self.nodes.items():
+            if len(path) > 2:
+                times[path[:-1]] -= stats[1]
+        return times
+
+    def function_stats(self) -> Dict[str, Tuple[int, float]]:
+        """Return calls and cumulative seconds per function name."""
+        result = {}
+        for name, paths in self.function_paths.items():
+            # Nested calls of the same function are counted once
+            outer = [path for path in paths if name not in path[1:-1]]
+            result[name] = (sum(self.nodes[path][0] for path in paths),
+                            sum(self.nodes[path][1] for path in outer))
+        return result
+
+    def folded(self) -> str:
+        """Return self times in microseconds as folded stacks for flamegraph tools."""
+        lines = []
+        for path, seconds in sorted(self.self_times().items()):
+            microseconds = round(seconds * 1e6)
+            if microseconds > 0:
+                lines.append(f"{';'.join(path)} {microseconds}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write_folded(self, filename: str) -> None:
+        """Write folded stacks to a file, e.g. for flamegraph.pl or speedscope."""
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(self.folded())
+
+    def report(self, cache: Optional["ParseCache"] = None,
+               functions: Optional[FunctionRegistry] = None, limit: int = 20) -> str:
+        """Return a text summary of phases, slowest nodes, functions and caches."""
+        evaluation = [0, 0.0]
+        for path, stats in self.nodes.items():
+            if len(path) == 2:
+                evaluation[0] += stats[0]
+                evaluation[1] += stats[1]
+        phases = dict(self.phases)
+        phases['evaluate'] = evaluation
+
+        lines = ["Phases:"]
+        for phase, (calls, seconds) in phases.items():
+            lines.append(f"  {phase:<10} {calls:>8} calls {seconds * 1000:>10.3f} ms")
+
+        self_times = self.self_times()
+        lines.append("Nodes (calls, total ms, self ms, path):")
+        slowest = sorted(self.nodes.items(), key=lambda item: item[1][1], reverse=True)
+        for path, (calls, seconds) in slowest[:limit]:
+            lines.append(f"  {calls:>8} {seconds * 1000:>10.3f} {self_times[path] * 1000:>10.3f}"
+                         f"  {' > '.join(path)}")
+
+        lines.append("Functions (calls, total ms):")
+        for name, (calls, seconds) in sorted(self.function_stats().items()):
+            lines.append(f"  {name:<10} {calls:>8} {seconds * 1000:>10.3f}")
+
+        if cache is not None:
+            stats = cache.stats()
+            lines.append(f"Parse cache: {stats['hits']} hits, {stats['misses']} misses, "
+                         f"{stats['evictions']} evictions, {stats['size']}/{stats['maxsize']} entries")
+        if functions is not None:
+            for name, function in functions.functions.items():
+                if function.cache is not None:
+                    lines.append(f"Memo {name}: {function.hits} hits, {function.misses} misses")
+        return "\n".join(lines)
+
+
+class ParseError(ValueError):
+    """Syntax error at a known position of the source text."""
+
+    def __init__(self, message: str, position: int):
+        super().__init__(f"{message} at position {position}")
+        self.position = position
+
+
+class Token(NamedTuple):
+    """Token of an expression with its offset in the source text."""
+    kind: str
+    text: str
+    position: int
+
+
+# Operator-stack entries other than binary operators
+OPEN_PAREN = '('
+OPEN_CALL = 'call'
+OPEN_ASSIGNMENT = '='
+
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+
+NUMBER_START = frozenset('0123456789.')
+NAME_START = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+SYMBOLS = frozenset('+-*/()=,;')
+
+EXPECT_OPERAND, EXPECT_OPERATOR, EXPECT_CALL = range(3)
+
+
+class Parser:
+    """Parser for mathematical expressions.
+
+    Tokens come from a single regular-expression scan and are combined by
+    an operator-precedence parser with explicit stacks, so the nesting
+    depth is not limited by Python's recursion limit. Trees deeper than
+    MAX_RECURSIVE_DEPTH are returned as Flattened, which evaluates them
+    without recursion as well.
+    """
+
+    # Every non-space character matches, so nothing is skipped silently
+    token_pattern = re.compile(
+        r'[+\-*/()=,;]|[a-zA-Z_][a-zA-Z0-9_]*|\d+\.?\d*|\.\d+|\S')
+
+    def __init__(self, optimize: bool = False, functions: Optional[FunctionRegistry] = None):
+        self.optimizer = Optimizer() if optimize else None
+        self.registry = functions if functions is not None else FunctionRegistry.with_builtins()
 
     def parse(self, expression: str) -> Expression:
-        """Parse a mathematical expression."""
-        self.tokens = self.tokenize(expression)
-        self.current = 0
-        return self.parse_expression()
+        """Parse a mathematical expression.
+
+        Raises:
+            ParseError: If the expression is not valid, with the offending position.
+        """
+        tree = self.parse_tokens(expression)
+        # A tree cannot be deeper than its text is long
+        if len(expression) > MAX_RECURSIVE_DEPTH and deeper_than(tree, MAX_RECURSIVE_DEPTH):
+            return Flattened(tree)
+        if self.optimizer is not None:
+            tree = self.optimizer.optimize(tree)
+        return tree
+
+    def compile(self, expression: str) -> CompiledExpression:
+        """Parse a mathematical expression and compile it into a function of variables."""
+        return self.parse(expression).compile()
+
+    def scan(self, expression: str) -> Iterator[Token]:
+        """Yield the tokens of an expression with their positions.
+
+        Raises:
+            ParseError: On a character that cannot start a token.
+        """
+        for match in self.token_pattern.finditer(expression):
+            text = match.group()
+            first = text[0]
+            if first in NUMBER_START and text != '.':
+                kind = 'number'
+            elif first in NAME_START:
+                kind = 'name'
+            elif first in SYMBOLS:
+                kind = 'symbol'
+            else:
+                raise ParseError(f"Unexpected character '{text}'", match.start())
+            yield Token(kind, text, match.start())
 
     def tokenize(self, expression: str) -> List[str]:
         """Convert expression string into tokens."""
-        pattern = r'([+\-*/()=,;]|[a-zA-Z_][a-zA-Z0-9_]*|\d*\.\d+|\d+)'
-        return [token for token in re.findall(pattern, expression) if token.strip()]
-
-    def parse_expression(self) -> Expression:
-        """Parse an expression."""
-        if self.current < len(self.tokens) - 1 and self.tokens[self.current + 1] == '=':
-            variable = self.tokens[self.current]
-            self.current += 2
-            return Assignment(variable, self.parse_term())
-        return self.parse_term()
-
-    def parse_term(self) -> Expression:
-        """Parse a term (addition/subtraction)."""
-        expr = self.parse_factor()
-
-        while self.current < len(self.tokens):
-            if self.tokens[self.current] in '+-':
-                operator = self.tokens[self.current]
-                self.current += 1
-                expr = BinaryOperation(expr, operator, self.parse_factor())
+        return [token.text for token in self.scan(expression)]
+
+    def error(self, expression: str, index: int, message: str) -> ParseError:
+        """Build an error for the token with the given index, or for the end if there is none."""
+        for i, match in enumerate(self.token_pattern.finditer(expression)):
+            if i == index:
+                return ParseError(message, match.start())
+        return ParseError(message, len(expression.rstrip()))
+
+    def parse_tokens(self, expression: str) -> Expression:
+        """Build the expression tree in one pass over the tokens."""
+        tokens = self.token_pattern.findall(expression)
+        functions = self.registry.functions
+        values: List[Expression] = []
+        push = values.append
+        # Binary operators as strings, brackets and assignments as tuples,
+        # with the precedence of each entry in levels; None is a sentinel
+        operators: List = [None]
+        levels = [0]
+        state = EXPECT_OPERAND
+        at_start = True
+        assignable = False
+
+        def reduce() -> None:
+            """Combine pending binary operators and assignments down to the nearest bracket."""
+            while True:
+                top = operators[-1]
+                if top.__class__ is str:
+                    right = values.pop()
+                    values[-1] = BinaryOperation(values[-1], top, right)
+                elif top is not None and top[0] == OPEN_ASSIGNMENT:
+                    values[-1] = Assignment(top[1], values[-1])
+                else:
+                    return
+                operators.pop()
+                levels.pop()
+
+        index = -1
+        for index, token in enumerate(tokens):
+            if state == EXPECT_OPERAND:
+                first = token[0]
+                if first in NUMBER_START:
+                    if token == '.':
+                        # Matched by the catch-all, numbers have a digit
+                        raise self.error(expression, index, "Unexpected character '.'")
+                    push(Number(float(token)))
+                    state = EXPECT_OPERATOR
+                elif first in NAME_START:
+                    if token in functions:
+                        operators.append((OPEN_CALL, token, len(values)))
+                        levels.append(0)
+                        state = EXPECT_CALL
+                    else:
+                        push(Variable(token))
+                        assignable = at_start
+                        state = EXPECT_OPERATOR
+                elif token == '(':
+                    operators.append((OPEN_PAREN,))
+                    levels.append(0)
+                    at_start = True
+                    continue
+                elif first in SYMBOLS:
+                    raise self.error(expression, index, f"Unexpected '{token}'")
+                else:
+                    raise self.error(expression, index, f"Unexpected character '{token}'")
+                at_start = False
+
+            elif state == EXPECT_OPERATOR:
+                precedence = PRECEDENCE.get(token)
+                if precedence is not None:
+                    while levels[-1] >= precedence:
+                        right = values.pop()
+                        values[-1] = BinaryOperation(values[-1], operators.pop(), right)
+                        levels.pop()
+                    operators.append(token)
+                    levels.append(precedence)
+                    state = EXPECT_OPERAND
+                elif token == ')':
+                    reduce()
+                    top = operators.pop()
+                    if top is None:
+                        raise self.error(expression, index, "Unexpected ')'")
+                    levels.pop()
+                    if top[0] == OPEN_CALL:
+                        args = values[top[2]:]
+                        del values[top[2]:]
+                        function = functions[top[1]]
+                        if function.arity != len(args):
+                            raise self.error(
+                                expression, index,
+                                f"Function {top[1]} expects {function.arity} argument(s), "
+                                f"got {len(args)}")
+                        push(Function(top[1], args, function))
+                elif token == ',':
+                    reduce()
+                    if operators[-1] is None or operators[-1][0] != OPEN_CALL:
+                        raise self.error(expression, index, "Unexpected ','")
+                    at_start = True
+                    state = EXPECT_OPERAND
+                elif token == '=' and assignable:
+                    operators.append((OPEN_ASSIGNMENT, values.pop().name))
+                    levels.append(0)
+                    state = EXPECT_OPERAND
+                elif token[0] in SYMBOLS or token[0] in NAME_START or token[0] in NUMBER_START:
+                    raise self.error(expression, index, f"Unexpected '{token}'")
+                else:
+                    raise self.error(expression, index, f"Unexpected character '{token}'")
+                assignable = False
+
             else:
-                break
+                if token != '(':
+                    raise self.error(expression, index,
+                                     f"Expected '(' after function {operators[-1][1]}")
+                at_start = True
+                state = EXPECT_OPERAND
+
+        if state == EXPECT_CALL:
+            raise self.error(expression, index + 1,
+                             f"Expected '(' after function {operators[-1][1]}")
+        if state == EXPECT_OPERAND:
+            raise self.error(expression, index + 1, "Unexpected end of expression")
+        reduce()
+        if operators[-1] is not None:
+            raise self.error(expression, index + 1, "Expected ')'")
+        return values[0]
+
+
+class ParseCache:
+    """Bounded LRU cache of parsed expressions keyed by normalized statement text."""
+
+    def __init__(self, parser: Parser, maxsize: int = 256):
+        self.parser = parser
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Expression]" = OrderedDict()
+        parser.registry.add_listener(self.invalidate)
+
+    @staticmethod
+    def normalize(expression: str) -> str:
+        """Collapse whitespace so equivalent statements share a cache entry."""
+        return ' '.join(expression.split())
+
+    def parse(self, expression: str) -> Expression:
+        """Return the parsed expression, parsing it only on a cache miss."""
+        key = self.normalize(expression)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        entry = self.parser.parse(key)
+        if self.maxsize > 0:
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self) -> None:
+        """Drop all cached expressions, e.g. after the set of functions changed."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self._entries),
+                'maxsize': self.maxsize}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Environment(dict):
+    """Variable values with an undo journal for cheap nested transactions.
 
-        return expr
+    Inside a transaction every write records the previous value, so a
+    rollback undoes only the writes made since the transaction began and
+    costs time proportional to those writes, not to the number of variables.
+    """
 
-    def parse_factor(self) -> Expression:
-        """Parse a factor (multiplication/division)."""
-        expr = self.parse_primary()
+    MISSING = object()
 
-        while self.current < len(self.tokens):
-            if self.tokens[self.current] in '*/':
-                operator = self.tokens[self.current]
-                self.current += 1
-                expr = BinaryOperation(expr, operator, self.parse_primary())
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._journal: List[Tuple[str, object]] = []
+        self._marks: List[int] = []
+
+    def __setitem__(self, name: str, value: float) -> None:
+        if self._marks:
+            self._journal.append((name, self.get(name, self.MISSING)))
+        super().__setitem__(name, value)
+
+    def __delitem__(self, name: str) -> None:
+        if self._marks:
+            self._journal.append((name, self[name]))
+        super().__delitem__(name)
+
+    def pop(self, name: str, *default):
+        if self._marks and name in self:
+            self._journal.append((name, self[name]))
+        return super().pop(name, *default)
+
+    def popitem(self) -> Tuple[str, object]:
+        item = super().popitem()
+        if self._marks:
+            self._journal.append(item)
+        return item
+
+    def setdefault(self, name: str, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def update(self, *args, **kwargs) -> None:
+        if not self._marks:
+            super().update(*args, **kwargs)
+            return
+        for name, value in dict(*args, **kwargs).items():
+            self[name] = value
+
+    def __ior__(self, other) -> "Environment":
+        self.update(other)
+        return self
+
+    def clear(self) -> None:
+        if self._marks:
+            self._journal.extend(self.items())
+        super().clear()
+
+    def begin(self) -> None:
+        """Start a (possibly nested) transaction."""
+        self._marks.append(len(self._journal))
+
+    def commit(self) -> None:
+        """Keep the writes of the innermost transaction."""
+        mark = self._marks.pop()
+        if not self._marks:
+            del self._journal[mark:]
+
+    def rollback(self) -> None:
+        """Undo the writes of the innermost transaction."""
+        mark = self._marks.pop()
+        journal = self._journal
+        while len(journal) > mark:
+            name, value = journal.pop()
+            if value is self.MISSING:
+                super().pop(name, None)
             else:
-                break
+                super().__setitem__(name, value)
 
-        return expr
+    @contextmanager
+    def transaction(self) -> Iterator["Environment"]:
+        """Commit the writes made in the block, or roll them back if it raises."""
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
 
-    def parse_primary(self) -> Expression:
-        """Parse a primary expression (number, variable, function, or parenthesized expression)."""
-        token = self.tokens[self.current]
-        self.current += 1
 
-        if token == '(':
-            expr = self.parse_expression()
-            if self.current >= len(self.tokens) or self.tokens[self.current] != ')':
-                raise ValueError("Expected ')'")
-            self.current += 1
-            return expr
+def free_variables(expression: Expression) -> Set[str]:
+    """Return the names of all variables an expression reads."""
+    names: Set[str] = set()
+    seen: Set[int] = set()
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, Variable):
+            names.add(node.name)
+        stack.extend(node.children())
+    return names
 
-        if token.replace('.', '').isdigit():
-            return Number(float(token))
 
-        if token in ['pow', 'log', 'sin', 'sqrt', 'abs']:
-            if self.current >= len(self.tokens) or self.tokens[self.current] != '(':
-                raise ValueError(f"Expected '(' after function {token}")
-            self.current += 1
+def assigned_variables(expression: Expression) -> Set[str]:
+    """Return the names of all variables an expression assigns, including nested assignments."""
+    names: Set[str] = set()
+    seen: Set[int] = set()
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, Assignment):
+            names.add(node.variable)
+        stack.extend(node.children())
+    return names
 
-            args = []
-            while True:
-                args.append(self.parse_expression())
-                if self.current >= len(self.tokens):
-                    raise ValueError("Expected ')'")
-                if self.tokens[self.current] == ')':
-                    self.current += 1
+
+def assignment_target(expression: Expression) -> Optional[str]:
+    """Return the variable assigned by a statement, or None if it is not an assignment."""
+    if isinstance(expression, (SharedScope, Flattened)):
+        expression = expression.expression
+    if isinstance(expression, Assignment):
+        return expression.variable
+    return None
+
+
+class Sheet:
+    """Variables defined by formulas that are recalculated when their inputs change.
+
+    Changing a variable recalculates only the formulas depending on it,
+    directly or transitively, in topological order.
+    """
+
+    def __init__(self):
+        self.values = Environment()
+        self.formulas: Dict[str, Expression] = {}
+        self.dependencies: Dict[str, Set[str]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+        self.errors: Dict[str, str] = {}
+        self.recalculated = 0
+
+    def dependents_order(self, name: str) -> List[str]:
+        """Return name and everything depending on it in topological order."""
+        order: List[str] = []
+        visited = {name}
+        stack = [(name, iter(self.dependents.get(name, ())))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in visited:
+                    visited.add(child)
+                    stack.append((child, iter(self.dependents.get(child, ()))))
                     break
-                if self.tokens[self.current] != ',':
-                    raise ValueError("Expected ',' or ')'")
-                self.current += 1
+            else:
+                stack.pop()
+                order.append(node)
+        order.reverse()
+        return order
+
+    def assign(self, name: str, statement: Expression) -> float:
+        """Set the formula of a variable and recalculate its dependents.
+
+        The statement must assign name. If it cannot be evaluated, the sheet
+        is left unchanged. Dependents failing to recalculate become undefined
+        and their error is kept in errors.
 
-            return Function(token, args)
+        Raises:
+            ValueError: If the formula creates a circular dependency or fails to evaluate.
+        """
+        reads = free_variables(statement)
+        affected = self.dependents_order(name)
+        cycle = reads.intersection(affected)
+        if cycle:
+            raise ValueError(f"Circular dependency: {name} -> {', '.join(sorted(cycle))}")
 
-        return Variable(token)
+        value = statement.evaluate(self.values)
+
+        for dependency in self.dependencies.get(name, ()):
+            self.dependents[dependency].discard(name)
+        for dependency in reads:
+            self.dependents.setdefault(dependency, set()).add(name)
+        self.dependencies[name] = reads
+        self.formulas[name] = statement
+        self.errors.pop(name, None)
+
+        self.recalculated = 1
+        for dependent in affected[1:]:
+            self.recalculate(dependent)
+        return value
+
+    def recalculate(self, name: str) -> None:
+        """Re-evaluate the formula of a single variable."""
+        self.recalculated += 1
+        try:
+            self.formulas[name].evaluate(self.values)
+            self.errors.pop(name, None)
+        except (ValueError, ArithmeticError) as e:
+            self.values.pop(name, None)
+            self.errors[name] = str(e)
+
+
+worker_cache: Optional[ParseCache] = None
+
+
+def init_worker(functions: FunctionRegistry) -> None:
+    """Set up the parse cache of a worker process with the calculator's functions."""
+    global worker_cache
+    worker_cache = ParseCache(Parser(functions=functions))
+
+
+def evaluate_statement(statement: str, variables: Dict[str, float],
+                       targets: List[str]) -> Tuple[Optional[float], Dict[str, float], Optional[str]]:
+    """Evaluate one statement in a worker process.
+
+    Returns:
+        The value, the variables the statement assigned and None, or
+        None, an empty dict and the error message if evaluation failed.
+    """
+    global worker_cache
+    if worker_cache is None:
+        worker_cache = ParseCache(Parser())
+    try:
+        environment = dict(variables)
+        value = worker_cache.parse(statement).evaluate(environment)
+        return value, {name: environment[name] for name in targets}, None
+    except Exception as e:
+        return None, {}, str(e)
 
 
 class Calculator:
-    """Main calculator class."""
+    """Main calculator class.
 
-    def __init__(self):
-        self.variables: Dict[str, float] = {}
-        self.parser = Parser()
+    In spreadsheet mode assignments keep their formulas, and reassigning a
+    variable recalculates every variable that depends on it.
+
+    With workers > 0, statements of one line that do not read each other's
+    results are evaluated concurrently in a process pool, wave by wave.
+    Results, variables and the reported error are the same as sequential
+    evaluation. Functions registered in self.functions must then be
+    picklable, e.g. defined at module level.
+
+    With profile=True, statements are evaluated one after another with
+    instrumented trees and self.profiler collects the timings.
+
+    Several calculators may share one parse_cache, e.g. one per client
+    of a server; its parser then replaces optimize and functions.
+    """
+
+    def __init__(self, cache_size: int = 256, optimize: bool = False,
+                 spreadsheet: bool = False, workers: int = 0,
+                 functions: Optional[FunctionRegistry] = None, profile: bool = False,
+                 parse_cache: Optional[ParseCache] = None):
+        if parse_cache is None:
+            parse_cache = ParseCache(Parser(optimize, functions), cache_size)
+        self.parser = parse_cache.parser
+        self.functions = self.parser.registry
+        self.parse_cache = parse_cache
+        self.sheet: Optional[Sheet] = Sheet() if spreadsheet else None
+        self.variables = self.sheet.values if self.sheet else Environment()
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.profiler: Optional[Profiler] = Profiler(parse_cache.maxsize) if profile else None
+        if workers > 0:
+            # Workers hold their own copy of the functions, so restart them on changes
+            self.functions.add_listener(self.close)
+
+    def close(self) -> None:
+        """Shut down the worker processes, if any were started."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def evaluate_statements(self, statements: List[str]) -> Optional[float]:
+        """Evaluate statements one after another and return the last result."""
+        last_result = None
+        profiler = self.profiler
+        for statement in statements:
+            if profiler is None:
+                expr_obj = self.parse_cache.parse(statement)
+                target = assignment_target(expr_obj)
+            else:
+                with profiler.timer('parse'):
+                    expr_obj = self.parse_cache.parse(statement)
+                target = assignment_target(expr_obj)
+                expr_obj = profiler.instrument(expr_obj, statement)
+            if self.sheet is not None and target is not None:
+                last_result = self.sheet.assign(target, expr_obj)
+                continue
+            if self.sheet is None:
+                with self.variables.transaction():
+                    last_result = expr_obj.evaluate(self.variables)
+                continue
+            # Only assignments may change the sheet
+            self.variables.begin()
+            try:
+                last_result = expr_obj.evaluate(self.variables)
+            finally:
+                self.variables.rollback()
+        return last_result
+
+    def evaluate_parallel(self, statements: List[str]) -> Optional[float]:
+        """Evaluate independent statements concurrently and return the last result.
+
+        A statement runs in the wave after the last earlier statement that
+        assigns a variable it reads, and receives exactly the values it
+        would see when run in order. Writes are applied in statement order
+        up to the first failing statement, whose error is raised.
+        """
+        failure: Optional[int] = None
+        error: Optional[Exception] = None
+        reads: List[Set[str]] = []
+        writes: List[List[str]] = []
+        for index, statement in enumerate(statements):
+            try:
+                expr_obj = self.parse_cache.parse(statement)
+            except ValueError as e:
+                failure, error = index, e
+                break
+            reads.append(free_variables(expr_obj))
+            writes.append(sorted(assigned_variables(expr_obj)))
+
+        # Which earlier statement provides each variable a statement reads
+        last_writer: Dict[str, int] = {}
+        sources: List[Dict[str, int]] = []
+        waves: List[List[int]] = []
+        wave_of: List[int] = []
+        for index in range(len(reads)):
+            source = {name: last_writer[name] for name in reads[index] if name in last_writer}
+            wave = 1 + max((wave_of[writer] for writer in source.values()), default=-1)
+            sources.append(source)
+            wave_of.append(wave)
+            if wave == len(waves):
+                waves.append([])
+            waves[wave].append(index)
+            for name in writes[index]:
+                last_writer[name] = index
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                                initargs=(self.functions,))
+
+        results: Dict[int, Tuple[Optional[float], Dict[str, float], Optional[str]]] = {}
+        for wave in waves:
+            # Statements after a known failure would never run in order
+            wave = [index for index in wave if failure is None or index < failure]
+            if not wave:
+                continue
+            snapshots = []
+            for index in wave:
+                snapshot = {name: self.variables[name] for name in reads[index]
+                            if name not in sources[index] and name in self.variables}
+                for name, writer in sources[index].items():
+                    snapshot[name] = results[writer][1][name]
+                snapshots.append(snapshot)
+            outcomes = self.executor.map(
+                evaluate_statement, [statements[index] for index in wave], snapshots,
+                [writes[index] for index in wave],
+                chunksize=max(1, len(wave) // (4 * self.workers)))
+            for index, outcome in zip(wave, outcomes):
+                results[index] = outcome
+                if outcome[2] is not None and (failure is None or index < failure):
+                    failure, error = index, ValueError(outcome[2])
+
+        last = len(statements) if failure is None else failure
+        last_result = None
+        for index in range(last):
+            value, assigned, _ = results[index]
+            with self.variables.transaction():
+                for name in writes[index]:
+                    self.variables[name] = assigned[name]
+            last_result = value
+        if error is not None:
+            raise error
+        return last_result
 
     def evaluate_expression(self, expression: str) -> None:
         """Evaluate a mathematical expression."""
@@ -208,12 +1751,10 @@ class Calculator:
             expressions = [expr.strip()
                            for expr in expression.split(';') if expr.strip()]
 
-            last_result = None
-            for expr in expressions:
-                current_vars = self.variables.copy()
-                expr_obj = self.parser.parse(expr)
-                last_result = expr_obj.evaluate(current_vars)
-                self.variables.update(current_vars)
+            if self.workers > 0 and self.sheet is None and self.profiler is None:
+                last_result = self.evaluate_parallel(expressions)
+            else:
+                last_result = self.evaluate_statements(expressions)
 
             if self.variables:
                 print("\nVariables:")
@@ -224,15 +1765,29 @@ class Calculator:
 
         except Exception as e:
             print(f"Error: {str(e)}")
-            self.variables.clear()
 
+    def profile_report(self) -> str:
+        """Return the profiler summary including cache statistics.
 
-def main() -> None:
-    """Run the calculator program."""
-    calculator = Calculator()
+        Raises:
+            ValueError: If the calculator was created without profile=True.
+        """
+        if self.profiler is None:
+            raise ValueError("Profiling is not enabled")
+        return self.profiler.report(self.parse_cache, self.functions)
+
+
+def main(profile_file: Optional[str] = None, profile: bool = False) -> None:
+    """Run the calculator program.
+
+    Args:
+        profile_file: File receiving folded stacks of the profile on exit.
+        profile: Whether to print a profile of the session on exit.
+    """
+    calculator = Calculator(profile=profile or profile_file is not None)
     print("Advanced Calculator")
     print("Supported operations: +, -, *, /")
-    print("Supported functions: pow, log, sin, sqrt, abs")
+    print(f"Supported functions: {', '.join(calculator.functions.functions)}")
     print("Multiple expressions can be separated by ';'")
     print("Enter 'q' to quit")
 
@@ -244,9 +1799,19 @@ def main() -> None:
 
             calculator.evaluate_expression(expression)
 
+        except EOFError:
+            break
         except Exception as e:
             print(f"Unexpected error: {e}")
 
+    if calculator.profiler is not None:
+        print(calculator.profile_report())
+        if profile_file is not None:
+            calculator.profiler.write_folded(profile_file)
+
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile":
+        main(sys.argv[2] if len(sys.argv) > 2 else None, profile=True)
+    else:
+        main()
@@ -0,0 +1,334 @@
+from typing import Callable, Dict, List
+import random
+import re
+import timeit
+import tracemalloc
+import contextlib
+import io
+
+import numpy as np
+
+from advanced_calc import (Parser, ParseCache, Sheet, Environment, FlatExpression, Calculator,
+                           FunctionRegistry, Profiler, Expression, Number, Variable,
+                           BinaryOperation, Function, Assignment, count_nodes)
+
+FORMULA = "pow(x, 2) + sqrt(abs(y) + 1) * sin(x) / (log(z + 1) + 1) - x * y"
+
+
+def make_bindings(count: int) -> List[Dict[str, float]]:
+    """Create random variable bindings for the benchmark formula."""
+    rng = random.Random(0)
+    return [{'x': rng.uniform(-10, 10), 'y': rng.uniform(-10, 10), 'z': rng.uniform(0, 10)}
+            for _ in range(count)]
+
+
+def measure(function: Callable[[], object], repeat: int = 5) -> float:
+    """Return the best wall time of several runs in seconds."""
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def bench_compile(count: int = 10000) -> None:
+    """Compare tree-walking evaluate with the generated function from compile()."""
+    expression = Parser().parse(FORMULA)
+    compiled = expression.compile()
+    bindings = make_bindings(count)
+
+    assert [expression.evaluate(b) for b in bindings] == [compiled(b) for b in bindings]
+
+    walk = measure(lambda: [expression.evaluate(b) for b in bindings])
+    generated = measure(lambda: [compiled(b) for b in bindings])
+    print(f"compile: {count} bindings, evaluate {walk * 1000:.1f} ms, "
+          f"compiled {generated * 1000:.1f} ms, speedup {walk / generated:.2f}x")
+
+
+def bench_parse_cache(count: int = 20000, distinct: int = 200) -> None:
+    """Compare parsing every statement with parsing through the LRU cache."""
+    rng = random.Random(0)
+    formulas = [f"{FORMULA} + {i}" for i in range(distinct)]
+    statements = [rng.choice(formulas) for _ in range(count)]
+    parser = Parser()
+
+    plain = measure(lambda: [parser.parse(s) for s in statements])
+
+    def cached_run() -> None:
+        cache = ParseCache(Parser(), maxsize=distinct)
+        for statement in statements:
+            cache.parse(statement)
+
+    cached = measure(cached_run)
+    print(f"parse cache: {count} statements, {distinct} distinct, parse {plain * 1000:.1f} ms, "
+          f"cached {cached * 1000:.1f} ms, speedup {plain / cached:.2f}x")
+
+
+def bench_batch(count: int = 100000) -> None:
+    """Compare a Python loop over evaluate with evaluate_batch over columns."""
+    expression = Parser().parse(FORMULA)
+    bindings = make_bindings(count)
+    columns = {name: np.array([b[name] for b in bindings]) for name in bindings[0]}
+
+    loop = measure(lambda: [expression.evaluate(b) for b in bindings], repeat=1)
+    batch = measure(lambda: expression.evaluate_batch(columns))
+    print(f"batch: {count} rows, evaluate loop {loop * 1000:.1f} ms, "
+          f"evaluate_batch {batch * 1000:.1f} ms, speedup {loop / batch:.2f}x")
+
+
+def bench_optimizer(count: int = 10000) -> None:
+    """Compare a formula with constant and repeated subtrees before and after optimization."""
+    formula = f"pow(2, 10) * x + sqrt(x*x + y*y) / (sqrt(x*x + y*y) + 1) - {FORMULA}"
+    expression = Parser().parse(formula)
+    parser = Parser(optimize=True)
+    optimized = parser.parse(formula)
+    bindings = make_bindings(count)
+
+    plain = measure(lambda: [expression.evaluate(b) for b in bindings])
+    fast = measure(lambda: [optimized.evaluate(b) for b in bindings])
+    print(f"optimizer: nodes {parser.optimizer.nodes_before} -> {parser.optimizer.nodes_after}, "
+          f"evaluate {plain * 1000:.1f} ms, optimized {fast * 1000:.1f} ms, "
+          f"speedup {plain / fast:.2f}x")
+
+
+def bench_sheet(count: int = 5000) -> None:
+    """Compare recalculating a whole sheet with recalculating only the dependents of an edit."""
+    parser = Parser()
+    statements = [parser.parse("v0 = 1")] + [
+        parser.parse(f"v{i} = v{i // 2} + v{i - 1} * 0.5") for i in range(1, count)]
+    sheet = Sheet()
+    for i, statement in enumerate(statements):
+        sheet.assign(f"v{i}", statement)
+
+    def full() -> None:
+        variables: Dict[str, float] = {}
+        for statement in statements:
+            statement.evaluate(variables)
+
+    edit = parser.parse(f"v{count - 10} = 2")
+    recalc_full = measure(full)
+    recalc_edit = measure(lambda: sheet.assign(f"v{count - 10}", edit))
+    print(f"sheet: {count} variables, full recalculation {recalc_full * 1000:.2f} ms, "
+          f"edit recalculating {sheet.recalculated} formulas {recalc_edit * 1000:.2f} ms")
+
+
+def bench_environment(size: int = 10000, count: int = 1000) -> None:
+    """Compare copying the variables per statement with a journaled environment."""
+    statement = Parser().parse("y = x * 2 + 1")
+    variables = {f"v{i}": float(i) for i in range(size)}
+    variables['x'] = 1.0
+    environment = Environment(variables)
+
+    def copying() -> None:
+        for _ in range(count):
+            current = variables.copy()
+            statement.evaluate(current)
+            variables.update(current)
+
+    def journaled() -> None:
+        for _ in range(count):
+            with environment.transaction():
+                statement.evaluate(environment)
+
+    copy_time = measure(copying)
+    journal_time = measure(journaled)
+    print(f"environment: {size} variables, {count} statements, copy {copy_time * 1000:.1f} ms, "
+          f"journal {journal_time * 1000:.1f} ms, speedup {copy_time / journal_time:.2f}x")
+
+
+class RecursiveDescentParser:
+    """The recursive-descent parser Parser replaced, kept as the baseline for bench_parser."""
+
+    pattern = re.compile(r'([+\-*/()=,;]|[a-zA-Z_][a-zA-Z0-9_]*|\d*\.\d+|\d+)')
+
+    def parse(self, expression: str) -> Expression:
+        self.tokens = [token for token in self.pattern.findall(expression) if token.strip()]
+        self.current = 0
+        return self.parse_expression()
+
+    def parse_expression(self) -> Expression:
+        if self.current < len(self.tokens) - 1 and self.tokens[self.current + 1] == '=':
+            variable = self.tokens[self.current]
+            self.current += 2
+            return Assignment(variable, self.parse_term())
+        return self.parse_term()
+
+    def parse_term(self) -> Expression:
+        expr = self.parse_factor()
+        while self.current < len(self.tokens) and self.tokens[self.current] in '+-':
+            operator = self.tokens[self.current]
+            self.current += 1
+            expr = BinaryOperation(expr, operator, self.parse_factor())
+        return expr
+
+    def parse_factor(self) -> Expression:
+        expr = self.parse_primary()
+        while self.current < len(self.tokens) and self.tokens[self.current] in '*/':
+            operator = self.tokens[self.current]
+            self.current += 1
+            expr = BinaryOperation(expr, operator, self.parse_primary())
+        return expr
+
+    def parse_primary(self) -> Expression:
+        token = self.tokens[self.current]
+        self.current += 1
+        if token == '(':
+            expr = self.parse_expression()
+            if self.current >= len(self.tokens) or self.tokens[self.current] != ')':
+                raise ValueError("Expected ')'")
+            self.current += 1
+            return expr
+        if token.replace('.', '').isdigit():
+            return Number(float(token))
+        if token in ['pow', 'log', 'sin', 'sqrt', 'abs']:
+            if self.current >= len(self.tokens) or self.tokens[self.current] != '(':
+                raise ValueError(f"Expected '(' after function {token}")
+            self.current += 1
+            args = []
+            while True:
+                args.append(self.parse_expression())
+                if self.current >= len(self.tokens):
+                    raise ValueError("Expected ')'")
+                if self.tokens[self.current] == ')':
+                    self.current += 1
+                    break
+                if self.tokens[self.current] != ',':
+                    raise ValueError("Expected ',' or ')'")
+                self.current += 1
+            return Function(token, args)
+        return Variable(token)
+
+
+def bench_parser(terms: int = 20000, nesting: int = 100, depth: int = 100000,
+                 checked_depth: int = 5000, rows: int = 1000) -> None:
+    """Compare Parser with the recursive-descent baseline and parse a deeply nested formula."""
+    parser = Parser()
+    baseline = RecursiveDescentParser()
+    flat = " + ".join(f"sqrt(x * {i}) / (y - {i % 7})" for i in range(terms))
+    nested = " + ".join("(" * nesting + f"x * {i}" + ")" * nesting for i in range(terms // nesting))
+    deep = "1 + (" * depth + "x" + ")" * depth
+
+    for name, formula in (('flat', flat), ('nested', nested)):
+        new_time = measure(lambda: parser.parse(formula), repeat=3)
+        old_time = measure(lambda: baseline.parse(formula), repeat=3)
+        print(f"parser: {len(formula) / 1e6:.2f} MB {name} formula {new_time * 1000:.0f} ms, "
+              f"recursive descent {old_time * 1000:.0f} ms, speedup {old_time / new_time:.2f}x")
+
+    deep_time = measure(lambda: parser.parse(deep), repeat=3)
+    try:
+        baseline.parse(deep)
+        baseline_result = "parses"
+    except RecursionError:
+        baseline_result = "exceeds the recursion limit"
+    print(f"parser: nesting depth {depth} {deep_time * 1000:.0f} ms, "
+          f"recursive descent {baseline_result}")
+
+    # Trees this deep are evaluated without recursion, one value or whole columns
+    tree = parser.parse("1 + (" * checked_depth + "x" + ")" * checked_depth)
+    batch = tree.evaluate_batch({'x': np.arange(rows, dtype=np.float64)})
+    expected = np.arange(rows) + checked_depth
+    if tree.evaluate({'x': 0.0}) != checked_depth or not np.array_equal(batch, expected):
+        raise AssertionError(f"Wrong result at nesting depth {checked_depth}")
+    batch_time = measure(lambda: tree.evaluate_batch({'x': np.arange(rows, dtype=np.float64)}),
+                         repeat=3)
+    print(f"parser: nesting depth {checked_depth} evaluate_batch of {rows} rows "
+          f"{batch_time * 1000:.0f} ms")
+
+
+def traced_size(build: Callable[[], object]) -> float:
+    """Return the memory in bytes allocated by build and still held by its result."""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_flat(formulas: int = 10000, count: int = 10000) -> None:
+    """Compare memory and evaluation speed of trees and flat expressions."""
+    parser = Parser()
+    sources = [f"{FORMULA} + {i}" for i in range(formulas)]
+    trees = [parser.parse(source) for source in sources]
+    nodes = sum(count_nodes(tree) for tree in trees)
+
+    tree_size = traced_size(lambda: [parser.parse(source) for source in sources])
+    flat_size = traced_size(lambda: [FlatExpression.from_expression(tree) for tree in trees])
+
+    bindings = make_bindings(count)
+    tree = trees[0]
+    flat = FlatExpression.from_expression(tree)
+    tree_time = measure(lambda: [tree.evaluate(b) for b in bindings])
+    flat_time = measure(lambda: [flat.evaluate(b) for b in bindings])
+    print(f"flat: {formulas} formulas, tree {tree_size / nodes:.0f} B/node, "
+          f"flat {flat_size / nodes:.0f} B/node, evaluate tree {tree_time * 1000:.1f} ms, "
+          f"flat {flat_time * 1000:.1f} ms")
+
+
+def bench_parallel(statements: int = 400, workers: int = 4) -> None:
+    """Compare sequential and process-pool evaluation of independent statements."""
+    term = " + ".join(f"sin(x * {i}) * sqrt(pow(x, 2) + {i})" for i in range(200))
+    line = "x = 1.5; " + "; ".join(f"v{i} = {term} + {i}" for i in range(statements))
+
+    def run(calculator: Calculator) -> float:
+        with contextlib.redirect_stdout(io.StringIO()):
+            calculator.evaluate_expression(line)
+            return measure(lambda: calculator.evaluate_expression(line), repeat=3)
+
+    sequential = run(Calculator())
+    calculator = Calculator(workers=workers)
+    parallel = run(calculator)
+    calculator.close()
+    print(f"parallel: {statements} statements, sequential {sequential * 1000:.0f} ms, "
+          f"{workers} workers {parallel * 1000:.0f} ms, speedup {sequential / parallel:.2f}x")
+
+
+def slow_gamma(value: float) -> float:
+    """Costly pure function: the gamma function by numeric integration."""
+    steps = 200
+    width = 40.0 / steps
+    return sum(((i + 0.5) * width) ** (value - 1) * np.exp(-(i + 0.5) * width) * width
+               for i in range(steps))
+
+
+def bench_registry(count: int = 2000, distinct: int = 20) -> None:
+    """Compare a costly user function with and without its memo cache on repeated arguments."""
+    bindings = [{'x': float(i % distinct + 1)} for i in range(count)]
+    times = {}
+    for cache_size in (0, 128):
+        functions = FunctionRegistry.with_builtins()
+        gamma = functions.register('gamma', slow_gamma, 1, cache_size=cache_size)
+        expression = Parser(functions=functions).parse("gamma(x) + x")
+        times[cache_size] = measure(lambda: [expression.evaluate(b) for b in bindings], repeat=3)
+    print(f"registry: {count} calls, {distinct} distinct arguments, uncached "
+          f"{times[0] * 1000:.1f} ms, memoized {times[128] * 1000:.1f} ms "
+          f"({gamma.hits} hits, {gamma.misses} misses), speedup {times[0] / times[128]:.2f}x")
+
+
+def bench_profile(count: int = 10000) -> None:
+    """Measure evaluation of an instrumented tree against the plain tree."""
+    expression = Parser().parse(FORMULA)
+    profiler = Profiler()
+    instrumented = profiler.instrument(expression, FORMULA)
+    bindings = make_bindings(count)
+
+    plain = measure(lambda: [expression.evaluate(b) for b in bindings])
+    profiled = measure(lambda: [instrumented.evaluate(b) for b in bindings])
+    print(f"profile: {count} bindings, evaluate {plain * 1000:.1f} ms, "
+          f"profiled {profiled * 1000:.1f} ms, overhead {profiled / plain:.2f}x, "
+          f"{len(profiler.folded().splitlines())} folded stacks")
+
+
+def main() -> None:
+    """Run all benchmarks."""
+    bench_compile()
+    bench_parse_cache()
+    bench_batch()
+    bench_optimizer()
+    bench_sheet()
+    bench_environment()
+    bench_parser()
+    bench_flat()
+    bench_parallel()
+    bench_registry()
+    bench_profile()
+
+
+if __name__ == "__main__":
+    main()
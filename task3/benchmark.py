@@ -0,0 +1,203 @@
+from typing import Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+
+# Must be set before the QApplication is created
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt6.QtWidgets import QApplication, QStyledItemDelegate, QTreeView
+
+from todo_model import TodoModel, TodoItem
+from todo_delegate import TodoDelegate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = (1000, 100000, 1000000)
+CATEGORIES = ["General", "Work", "Personal", "Health", "Shopping"]
+WORDS = ["review", "report", "call", "buy", "milk", "project", "meeting", "fix", "plan",
+         "email", "garden", "budget", "doctor", "train", "book", "clean", "draft", "pay"]
+
+# Roles a view asks a model for when painting a cell with QStyledItemDelegate
+PAINT_ROLES = [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.DecorationRole,
+               Qt.ItemDataRole.FontRole, Qt.ItemDataRole.TextAlignmentRole,
+               Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.BackgroundRole,
+               Qt.ItemDataRole.CheckStateRole]
+
+# Run in a fresh interpreter so imports are not already cached
+STARTUP_SCRIPT = """
+import json, sys
+from time import perf_counter
+start = perf_counter()
+from PyQt6.QtWidgets import QApplication
+qt_loaded = perf_counter()
+sys.path.insert(0, sys.argv[1])
+import main
+imported = perf_counter()
+app = QApplication([])
+app_created = perf_counter()
+view = main.TodoView()
+constructed = perf_counter()
+view.show()
+app.processEvents()
+shown = perf_counter()
+print(json.dumps({'qt_import_s': qt_loaded - start, 'main_import_s': imported - qt_loaded,
+                  'application_s': app_created - imported, 'construct_s': constructed - app_created,
+                  'first_show_s': shown - constructed}))
+"""
+
+
+def make_items(count: int) -> List[TodoItem]:
+    """Create reproducible tasks."""
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1, 9, 0)
+    return [TodoItem(title=" ".join(rng.choices(WORDS, k=3)),
+                     description=" ".join(rng.choices(WORDS, k=8)),
+                     due_date=start + timedelta(minutes=rng.randrange(525600)),
+                     completed=rng.random() < 0.3,
+                     category=rng.choice(CATEGORIES))
+            for _ in range(count)]
+
+
+def measure(function: Callable[[], object], repeat: int = 5) -> float:
+    """Return the best wall time of several runs in seconds."""
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def bench_populate(items: List[TodoItem]) -> Dict[str, float]:
+    """Measure loading tasks into a model with setItems and appending them with addItems."""
+    repeat = 3 if len(items) <= 100000 else 1
+    populate = measure(lambda: TodoModel().setItems(items), repeat=repeat)
+
+    def append() -> None:
+        model = TodoModel()
+        model.addItems(items[:1])
+        model.addItems(items[1:])
+
+    appended = measure(append, repeat=repeat)
+    return {'set_items_s': populate, 'set_items_rows_per_s': len(items) / populate,
+            'add_items_s': appended}
+
+
+def bench_data(model: TodoModel, calls: int = 200000) -> Dict[str, float]:
+    """Measure data() on random cells, first with a cold due-date cache and then warm."""
+    rng = random.Random(1)
+    rows = model.rowCount()
+    columns = model.columnCount()
+    indexes = [model.index(rng.randrange(rows), rng.randrange(columns)) for _ in range(calls)]
+    data = model.data
+
+    def display() -> None:
+        for index in indexes:
+            data(index, Qt.ItemDataRole.DisplayRole)
+
+    def painting() -> None:
+        for index in indexes[:calls // len(PAINT_ROLES)]:
+            for role in PAINT_ROLES:
+                data(index, role)
+
+    cold = measure(display, repeat=1)
+    warm = measure(display)
+    mixed = measure(painting)
+    return {'data_cold_calls_per_s': calls / cold, 'data_calls_per_s': calls / warm,
+            'data_paint_roles_calls_per_s': calls // len(PAINT_ROLES) * len(PAINT_ROLES) / mixed}
+
+
+def bench_paint(model: TodoModel, delegate: Optional[QStyledItemDelegate] = None,
+                width: int = 1024, height: int = 768) -> Dict[str, float]:
+    """Measure painting a full viewport at the top, the middle and the end of the model."""
+    view = QTreeView()
+    view.setAlternatingRowColors(True)
+    view.setUniformRowHeights(True)
+    view.setItemDelegate(delegate or TodoDelegate(view))
+    view.resize(width, height)
+
+    shown = measure(lambda: (view.setModel(model), view.show(), QApplication.processEvents()),
+                    repeat=1)
+    viewport = view.viewport()
+    times = []
+    for row in (0, model.rowCount() // 2, model.rowCount() - 1):
+        view.scrollTo(model.index(row, 0))
+        QApplication.processEvents()
+        times.append(measure(viewport.grab))
+    visible = view.indexAt(viewport.rect().bottomLeft()).row() - view.indexAt(
+        viewport.rect().topLeft()).row() + 1
+    if visible <= 0:
+        visible = model.rowCount() - view.indexAt(viewport.rect().topLeft()).row()
+    view.close()
+    view.deleteLater()
+    return {'show_s': shown, 'paint_ms': 1000 * sum(times) / len(times),
+            'paint_worst_ms': 1000 * max(times), 'visible_rows': visible}
+
+
+def bench_startup(task: str, repeat: int = 3) -> Dict[str, float]:
+    """Measure importing a task's main module and constructing and showing its window."""
+    directory = os.path.join(ROOT, task)
+    env = dict(os.environ, PYTHONPATH=ROOT, QT_QPA_PLATFORM="offscreen")
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, directory], env=env,
+                                cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {name: min(run[name] for run in runs) for name in runs[0]}
+
+
+def run(sizes=SIZES) -> Dict[str, object]:
+    """Run all benchmarks and return their results."""
+    application = QApplication.instance() or QApplication(sys.argv[:1])
+    results: Dict[str, object] = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'qt': QT_VERSION_STR, 'pyqt': PYQT_VERSION_STR,
+        'platform': platform.platform(), 'qpa': application.platformName(),
+        'sizes': {}, 'startup': {}}
+
+    for size in sizes:
+        print(f"{size} rows", file=sys.stderr)
+        items = make_items(size)
+        model = TodoModel()
+        model.setItems(items)
+        result = bench_populate(items)
+        result.update(bench_data(model))
+        result.update(bench_paint(model))
+        result['paint_default_delegate_ms'] = bench_paint(
+            model, QStyledItemDelegate())['paint_ms']
+        results['sizes'][str(size)] = result
+
+    for task in ("task3", "task4"):
+        print(f"{task} startup", file=sys.stderr)
+        results['startup'][task] = bench_startup(task)
+    return results
+
+
+def parse_sizes(text: str) -> List[int]:
+    """Parse comma-separated item counts such as 1000,100000."""
+    try:
+        return [int(size) for size in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated numbers, got {text!r}")
+
+
+def main() -> None:
+    """Run the benchmarks and write JSON results to stdout or the given file."""
+    parser = argparse.ArgumentParser(description="Benchmark the todo model and its view.")
+    parser.add_argument('--sizes', type=parse_sizes, default=SIZES,
+                        help="comma-separated item counts (default: "
+                             f"{','.join(map(str, SIZES))})")
+    parser.add_argument('output', nargs='?', help="file receiving the results instead of stdout")
+    arguments = parser.parse_args()
+    output = json.dumps(run(arguments.sizes), indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,10 @@ import sys
 from datetime import datetime
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLineEdit, QTextEdit,
-                             QDateTimeEdit, QComboBox, QTreeView, QMessageBox)
+                             QDateTimeEdit, QComboBox, QTreeView, QMessageBox,
+                             QAbstractItemView)
 from PyQt6.QtCore import Qt
-from todo_model import TodoModel, TodoItem
+from todo_model import TodoModel, TodoItem, TodoFilterModel
 from todo_delegate import TodoDelegate
 
 
@@ -17,6 +18,7 @@ class TodoView(QMainWindow):
         self.setGeometry(100, 100, 800, 600)
 
         self.model = TodoModel()
+        self.proxy = TodoFilterModel(self.model, self)
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -40,6 +42,7 @@ class TodoView(QMainWindow):
         self.category_input = QComboBox()
         self.category_input.setEditable(True)
         self.category_input.addItem("General")
+        self.categories = {"General"}
         form_layout.addWidget(self.category_input)
 
         add_button = QPushButton("Add Task")
@@ -48,10 +51,31 @@ class TodoView(QMainWindow):
 
         layout.addLayout(form_layout)
 
+        filter_layout = QHBoxLayout()
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search tasks")
+        self.search_input.textChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.search_input)
+
+        self.status_filter = QComboBox()
+        self.status_filter.addItems(["All", "Pending", "Completed"])
+        self.status_filter.currentIndexChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.status_filter)
+
+        self.category_filter = QComboBox()
+        self.category_filter.addItems(["All categories", "General"])
+        self.category_filter.currentIndexChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.category_filter)
+
+        layout.addLayout(filter_layout)
+
         self.tree_view = QTreeView()
-        self.tree_view.setModel(self.model)
+        self.tree_view.setModel(self.proxy)
         self.tree_view.setItemDelegate(TodoDelegate())
         self.tree_view.setAlternatingRowColors(True)
+        self.tree_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.tree_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         layout.addWidget(self.tree_view)
 
         button_layout = QHBoxLayout()
@@ -88,9 +112,22 @@ class TodoView(QMainWindow):
 
         self.model.addItem(item)
         self.clear_inputs()
-
-        if category not in [self.category_input.itemText(i) for i in range(self.category_input.count())]:
-            self.category_input.addItem(category)
+        self.add_categories([category])
+
+    def add_categories(self, categories):
+        """Add categories not offered yet to the category box."""
+        for category in categories:
+            if category not in self.categories:
+                self.categories.add(category)
+                self.category_input.addItem(category)
+                self.category_filter.addItem(category)
+
+    def apply_filter(self):
+        """Show only tasks matching the search text, status and category filters."""
+        status = self.status_filter.currentIndex()
+        completed = None if status == 0 else status == 2
+        category = self.category_filter.currentText() if self.category_filter.currentIndex() > 0 else None
+        self.proxy.setFilter(self.search_input.text(), category, completed)
 
     def clear_inputs(self):
         """Clear all input fields."""
@@ -99,26 +136,23 @@ class TodoView(QMainWindow):
         self.due_date_input.setDateTime(datetime.now())
         self.category_input.setCurrentText("General")
 
-    def mark_completed(self):
-        """Mark selected task as completed."""
-        indexes = self.tree_view.selectedIndexes()
-        if not indexes:
-            return
+    def selected_rows(self):
+        """Return the distinct model rows with a selected cell."""
+        return sorted({self.proxy.mapToSource(index).row()
+                       for index in self.tree_view.selectedIndexes()})
 
-        row = indexes[0].row()
-        item = self.model.getItem(row)
-        if item:
+    def mark_completed(self):
+        """Mark selected tasks as completed."""
+        updates = []
+        for row in self.selected_rows():
+            item = self.model.getItem(row)
             item.completed = True
-            self.model.updateItem(row, item)
+            updates.append((row, item))
+        self.model.updateItems(updates)
 
     def delete_task(self):
-        """Delete selected task."""
-        indexes = self.tree_view.selectedIndexes()
-        if not indexes:
-            return
-
-        row = indexes[0].row()
-        self.model.removeItem(row)
+        """Delete selected tasks."""
+        self.model.removeItems(self.selected_rows())
 
     def add_sample_tasks(self):
         """Add some sample tasks to demonstrate the application."""
@@ -144,10 +178,8 @@ class TodoView(QMainWindow):
             )
         ]
 
-        for task in sample_tasks:
-            self.model.addItem(task)
-            if task.category not in [self.category_input.itemText(i) for i in range(self.category_input.count())]:
-                self.category_input.addItem(task.category)
+        self.model.addItems(sample_tasks)
+        self.add_categories({task.category for task in sample_tasks})
 
 
 def main():
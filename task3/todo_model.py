@@ -1,10 +1,23 @@
-from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, QObject
-from typing import List, Dict, Optional
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject
+import re
+import sys
+from typing import List, Dict, Optional, Tuple, Iterator, Sequence, Iterable, Set, Sized
 from dataclasses import dataclass
 from datetime import datetime
+from bisect import bisect_left
+from array import array
+from collections import OrderedDict
+from abc import ABC, abstractmethod
 
+import numpy as np
+from sortedcontainers import SortedList
 
-@dataclass
+
+# Items without a __dict__ take less than half the memory; slots need Python 3.10
+COMPACT = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**COMPACT)
 class TodoItem:
     """Class representing a todo item."""
     title: str
@@ -13,14 +26,273 @@ class TodoItem:
     completed: bool = False
     category: str = "General"
 
+    def __post_init__(self):
+        # Few distinct categories are shared by many items
+        self.category = sys.intern(self.category)
+
+
+HEADERS = ["Title", "Description", "Due Date", "Status"]
+
+DISPLAY_ROLE = Qt.ItemDataRole.DisplayRole
+
+DUE_DATE_COLUMN = 2
+
+
+def display_text(item: TodoItem, column: int) -> Optional[str]:
+    """Return the text shown for an item in a column."""
+    if column == 0:
+        return item.title
+    elif column == 1:
+        return item.description
+    elif column == 2:
+        return item.due_date.strftime("%Y-%m-%d %H:%M")
+    elif column == 3:
+        return "Completed" if item.completed else "Pending"
+    return None
+
+
+def contiguous_blocks(rows: Iterable[int], count: int) -> List[Tuple[int, int]]:
+    """Group valid distinct rows into ascending (first, last) blocks of consecutive rows."""
+    blocks: List[Tuple[int, int]] = []
+    for row in sorted(set(row for row in rows if 0 <= row < count)):
+        if blocks and blocks[-1][1] == row - 1:
+            blocks[-1] = (blocks[-1][0], row)
+        else:
+            blocks.append((row, row))
+    return blocks
+
+
+# Due dates are indexed as single integers: microseconds << KEY_BITS | key
+KEY_BITS = 32
+KEY_MASK = (1 << KEY_BITS) - 1
+
+
+def due_number(due_date: datetime) -> int:
+    """Return a datetime as microseconds since 0001-01-01, ignoring any time zone."""
+    seconds = due_date.toordinal() * 86400 + due_date.hour * 3600 + due_date.minute * 60 + due_date.second
+    return seconds * 1000000 + due_date.microsecond
+
+
+class TodoIndex:
+    """Secondary indexes of todo items by category, completion status and due date.
+
+    Items are identified by stable integer keys below 2**32 rather than
+    rows, so the indexes stay valid when rows shift. Keys are expected to
+    be handed out densely from 0, as indexed values are kept in arrays
+    indexed by key. Every change costs O(log n).
+    """
+
+    def __init__(self):
+        self.categories: Dict[str, SortedList] = {"General": SortedList()}
+        self.statuses: Dict[bool, SortedList] = {False: SortedList(), True: SortedList()}
+        self.due_dates: Dict[bool, SortedList] = {False: SortedList(), True: SortedList()}
+        # Indexed values per key, category code -1 for removed keys; items
+        # may be changed in place before update()
+        self.category_codes = array('q')
+        self.completed_of = bytearray()
+        self.due_of = array('q')
+        self.category_names: List[str] = []
+        self.category_ids: Dict[str, int] = {}
+
+    def store(self, key: int, category: str, completed: bool, due: int) -> None:
+        if key >= len(self.category_codes):
+            missing = key + 1 - len(self.category_codes)
+            self.category_codes.extend([-1] * missing)
+            self.completed_of.extend(bytes(missing))
+            self.due_of.extend([0] * missing)
+        if category not in self.category_ids:
+            self.category_ids[category] = len(self.category_names)
+            self.category_names.append(category)
+        self.category_codes[key] = self.category_ids[category]
+        self.completed_of[key] = completed
+        self.due_of[key] = due
+
+    def add(self, key: int, item: TodoItem) -> None:
+        """Index an item under its key."""
+        completed = bool(item.completed)
+        due = due_number(item.due_date)
+        self.store(key, item.category, completed, due)
+        if item.category not in self.categories:
+            self.categories[item.category] = SortedList()
+        self.categories[item.category].add(key)
+        self.statuses[completed].add(key)
+        self.due_dates[completed].add(due << KEY_BITS | key)
+
+    def add_many(self, keys: Sequence[int], items: Sequence[TodoItem]) -> None:
+        """Index many items at once, sorting each index once instead of per item."""
+        categories: Dict[str, List[int]] = {}
+        statuses: Dict[bool, List[int]] = {False: [], True: []}
+        due_dates: Dict[bool, List[int]] = {False: [], True: []}
+        for key, item in zip(keys, items):
+            completed = bool(item.completed)
+            due = due_number(item.due_date)
+            self.store(key, item.category, completed, due)
+            categories.setdefault(item.category, []).append(key)
+            statuses[completed].append(key)
+            due_dates[completed].append(due << KEY_BITS | key)
+
+        for category, category_keys in categories.items():
+            if category not in self.categories:
+                self.categories[category] = SortedList()
+            self.categories[category].update(category_keys)
+        for completed in (False, True):
+            self.statuses[completed].update(statuses[completed])
+            self.due_dates[completed].update(due_dates[completed])
+
+    def remove(self, key: int) -> None:
+        """Remove the item with the given key from the indexes."""
+        code = self.category_codes[key]
+        if code < 0:
+            raise KeyError(key)
+        category = self.category_names[code]
+        completed = bool(self.completed_of[key])
+        self.category_codes[key] = -1
+        keys = self.categories[category]
+        keys.remove(key)
+        if not keys and category != "General":
+            del self.categories[category]
+        self.statuses[completed].remove(key)
+        self.due_dates[completed].remove(self.due_of[key] << KEY_BITS | key)
+
+    def update(self, key: int, item: TodoItem) -> None:
+        """Re-index an item whose category, status or due date may have changed."""
+        if (self.category_names[self.category_codes[key]] != item.category
+                or self.completed_of[key] != bool(item.completed)
+                or self.due_of[key] != due_number(item.due_date)):
+            self.remove(key)
+            self.add(key, item)
+
+    def category_keys(self, category: str) -> Iterator[int]:
+        """Return keys of a category in insertion order."""
+        return iter(self.categories.get(category, ()))
+
+    def status_keys(self, completed: bool) -> Iterator[int]:
+        """Return keys with the given completion status in insertion order."""
+        return iter(self.statuses[completed])
+
+    def due_keys(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 completed: Optional[bool] = None) -> List[int]:
+        """Return keys due in [start, end) ordered by due date.
+
+        Args:
+            start: Earliest due date, or None for no lower bound.
+            end: Due date to stop before, or None for no upper bound.
+            completed: Status to restrict to, or None for both.
+        """
+        statuses = [False, True] if completed is None else [completed]
+        values: List[int] = []
+        for status in statuses:
+            due_dates = self.due_dates[status]
+            first = 0 if start is None else due_dates.bisect_left(due_number(start) << KEY_BITS)
+            last = len(due_dates) if end is None else due_dates.bisect_left(due_number(end) << KEY_BITS)
+            values.extend(due_dates.islice(first, last))
+        if len(statuses) > 1:
+            values.sort()
+        return [value & KEY_MASK for value in values]
+
+
+class TodoSearchIndex:
+    """Inverted index from lower-case words of titles and descriptions to item keys."""
+
+    word_pattern = re.compile(r'\w+')
+
+    def __init__(self):
+        self.postings: Dict[str, Set[int]] = {}
+        # Words with postings, sorted so words starting with a prefix are adjacent
+        self.vocabulary = SortedList()
+        self.words_of: Dict[int, Tuple[str, ...]] = {}
+
+    @classmethod
+    def words(cls, text: str) -> List[str]:
+        """Split text into lower-case words."""
+        return cls.word_pattern.findall(text.lower())
+
+    def item_words(self, item: TodoItem) -> Tuple[str, ...]:
+        return tuple(set(map(sys.intern, self.words(item.title) + self.words(item.description))))
+
+    def add(self, key: int, item: TodoItem) -> None:
+        """Index the words of an item under its key."""
+        words = self.words_of[key] = self.item_words(item)
+        for word in words:
+            keys = self.postings.get(word)
+            if keys is None:
+                keys = self.postings[word] = set()
+                self.vocabulary.add(word)
+            keys.add(key)
+
+    def add_many(self, keys: Iterable[int], items: Iterable[TodoItem]) -> None:
+        """Index many items, sorting new words into the vocabulary once."""
+        postings = self.postings
+        new_words = []
+        for key, item in zip(keys, items):
+            words = self.words_of[key] = self.item_words(item)
+            for word in words:
+                word_keys = postings.get(word)
+                if word_keys is None:
+                    word_keys = postings[word] = set()
+                    new_words.append(word)
+                word_keys.add(key)
+        self.vocabulary.update(new_words)
+
+    def remove(self, key: int) -> None:
+        """Remove the words of the item with the given key."""
+        for word in self.words_of.pop(key):
+            keys = self.postings[word]
+            keys.discard(key)
+            if not keys:
+                del self.postings[word]
+                self.vocabulary.remove(word)
+
+    def update(self, key: int, item: TodoItem) -> None:
+        """Re-index an item whose title or description may have changed."""
+        if set(self.words_of[key]) != set(self.item_words(item)):
+            self.remove(key)
+            self.add(key, item)
+
+    def prefix_words(self, prefix: str) -> List[str]:
+        """Return the indexed words starting with prefix."""
+        vocabulary = self.vocabulary
+        start = vocabulary.bisect_left(prefix)
+        stop = vocabulary.bisect_left(prefix + '\U0010ffff')
+        return list(vocabulary.islice(start, stop))
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        """Return keys of items containing every word of query, or None if it has no words.
+
+        The last word also matches longer words unless the query ends with
+        a space, so results narrow down while the user is typing. The
+        returned set may be shared with the index and must not be modified.
+        """
+        words = self.words(query)
+        if not words:
+            return None
+        exact = words if query[-1:].isspace() else words[:-1]
+        postings = self.postings
+        sets = sorted((postings.get(word, set()) for word in exact), key=len)
+        found = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0] if sets else None
+        if len(exact) == len(words):
+            return found
+        prefixed = [postings[word] for word in self.prefix_words(words[-1])]
+        if found is None:
+            return prefixed[0] if len(prefixed) == 1 else set().union(*prefixed)
+        # Narrow each word's keys down first instead of building the whole prefix union
+        return set().union(*[found & keys for keys in prefixed])
+
 
-class TodoModel(QAbstractItemModel):
+class TodoModel(QAbstractTableModel):
     """Custom model for todo items."""
 
     def __init__(self, parent: Optional[QObject] = None):
         super().__init__(parent)
         self._items: List[TodoItem] = []
-        self._categories: Dict[str, List[int]] = {"General": []}
+        # Formatted due date per row, filled when first shown
+        self._due_texts: List[Optional[str]] = []
+        # Stable key of the item in each row; ascending because items are only appended
+        self._keys = array('q')
+        self._next_key = 0
+        self._index = TodoIndex()
+        # Built by enableSearch() on the first search for words
+        self._search: Optional[TodoSearchIndex] = None
 
     def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
         """Return the number of columns."""
@@ -34,61 +306,138 @@ class TodoModel(QAbstractItemModel):
 
     def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
         """Create and return an index for the given row and column."""
-        if not self.hasIndex(row, column, parent):
+        # Checked here because hasIndex() calls back into rowCount() and columnCount()
+        if parent.isValid() or not (0 <= row < len(self._items) and 0 <= column < len(HEADERS)):
             return QModelIndex()
         return self.createIndex(row, column)
 
-    def parent(self, child: QModelIndex) -> QModelIndex:
-        """Return the parent index."""
-        return QModelIndex()
-
     def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
         """Return the data for the given role."""
-        if not index.isValid():
+        # Views ask for many roles per cell; only the display role has data
+        if role != DISPLAY_ROLE:
             return None
 
-        if role == Qt.ItemDataRole.DisplayRole:
-            item = self._items[index.row()]
-            if index.column() == 0:
-                return item.title
-            elif index.column() == 1:
-                return item.description
-            elif index.column() == 2:
-                return item.due_date.strftime("%Y-%m-%d %H:%M")
-            elif index.column() == 3:
-                return "Completed" if item.completed else "Pending"
-
-        return None
+        # An invalid index has row -1, which saves a call to isValid()
+        row = index.row()
+        if row < 0:
+            return None
+        column = index.column()
+        if column == DUE_DATE_COLUMN:
+            text = self._due_texts[row]
+            if text is None:
+                text = self._due_texts[row] = display_text(self._items[row], column)
+            return text
+        return display_text(self._items[row], column)
 
     def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
         """Return the header data."""
         if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
-            headers = ["Title", "Description", "Due Date", "Status"]
-            return headers[section]
+            return HEADERS[section]
         return None
 
     def addItem(self, item: TodoItem) -> None:
         """Add a new todo item."""
         self.beginInsertRows(QModelIndex(), len(self._items), len(self._items))
         self._items.append(item)
-        if item.category not in self._categories:
-            self._categories[item.category] = []
-        self._categories[item.category].append(len(self._items) - 1)
+        self._due_texts.append(None)
+        self._keys.append(self._next_key)
+        self._index.add(self._next_key, item)
+        if self._search is not None:
+            self._search.add(self._next_key, item)
+        self._next_key += 1
         self.endInsertRows()
 
+    def addItems(self, items: Iterable[TodoItem]) -> None:
+        """Append many todo items with a single insert, or a reset if the model is empty."""
+        items = list(items)
+        if not items:
+            return
+        first = len(self._items)
+        if first == 0:
+            self.beginResetModel()
+        else:
+            self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        keys = range(self._next_key, self._next_key + len(items))
+        self._items.extend(items)
+        self._due_texts.extend([None] * len(items))
+        self._keys.extend(keys)
+        self._index.add_many(keys, items)
+        if self._search is not None:
+            self._search.add_many(keys, items)
+        self._next_key += len(items)
+        if first == 0:
+            self.endResetModel()
+        else:
+            self.endInsertRows()
+
+    def setItems(self, items: Iterable[TodoItem], keys: Optional[Iterable[int]] = None) -> None:
+        """Replace all todo items with a single model reset.
+
+        Args:
+            items: The new items in row order.
+            keys: Stable keys of the items, ascending and below 2**32, for
+                example keys saved with the items earlier. By default the
+                items are numbered from 0.
+        """
+        items = list(items)
+        keys = array('q', range(len(items)) if keys is None else keys)
+        if len(keys) != len(items):
+            raise ValueError("Expected one key per item")
+        if any(a >= b for a, b in zip(keys, keys[1:])):
+            raise ValueError("Keys must be ascending")
+        self.beginResetModel()
+        self._items = items
+        self._due_texts = [None] * len(items)
+        self._keys = keys
+        self._index = TodoIndex()
+        self._index.add_many(keys, items)
+        # Rebuilt by the next search for words rather than for every reset
+        self._search = None
+        self._next_key = keys[-1] + 1 if keys else 0
+        self.endResetModel()
+
     def removeItem(self, row: int) -> None:
         """Remove a todo item."""
-        if 0 <= row < len(self._items):
-            self.beginRemoveRows(QModelIndex(), row, row)
-            item = self._items.pop(row)
-            self._categories[item.category].remove(row)
-            self.endRemoveRows()
+        self.removeRows(row, 1)
+
+    def removeRows(self, row: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        """Remove count contiguous rows starting at row with a single signal."""
+        if parent.isValid() or count <= 0 or row < 0 or row + count > len(self._items):
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        for key in self._keys[row:row + count]:
+            self._index.remove(key)
+            if self._search is not None:
+                self._search.remove(key)
+        del self._items[row:row + count]
+        del self._due_texts[row:row + count]
+        del self._keys[row:row + count]
+        self.endRemoveRows()
+        return True
+
+    def removeItems(self, rows: Iterable[int]) -> None:
+        """Remove todo items by row, one signal per contiguous block of rows."""
+        # From the bottom up, so removing a block does not shift the rows still to remove
+        for first, last in reversed(contiguous_blocks(rows, len(self._items))):
+            self.removeRows(first, last - first + 1)
 
     def updateItem(self, row: int, item: TodoItem) -> None:
         """Update a todo item."""
-        if 0 <= row < len(self._items):
-            self._items[row] = item
-            self.dataChanged.emit(self.index(row, 0), self.index(row, 3))
+        self.updateItems([(row, item)])
+
+    def updateItems(self, updates: Iterable[Tuple[int, TodoItem]]) -> None:
+        """Update todo items given as (row, item), one signal per contiguous block of rows."""
+        rows = []
+        for row, item in updates:
+            if 0 <= row < len(self._items):
+                self._items[row] = item
+                self._due_texts[row] = None
+                self._index.update(self._keys[row], item)
+                if self._search is not None:
+                    self._search.update(self._keys[row], item)
+                rows.append(row)
+        for first, last in contiguous_blocks(rows, len(self._items)):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(HEADERS) - 1))
 
     def getItem(self, row: int) -> Optional[TodoItem]:
         """Get a todo item by row."""
@@ -96,17 +445,433 @@ class TodoModel(QAbstractItemModel):
             return self._items[row]
         return None
 
+    def getItems(self) -> List[TodoItem]:
+        """Get all items in row order."""
+        return list(self._items)
+
+    def keyOfRow(self, row: int) -> int:
+        """Return the stable key of the item in a row."""
+        return self._keys[row]
+
+    def getKeys(self) -> array:
+        """Get the stable keys of all items in row order."""
+        return array('q', self._keys)
+
+    def rowOfKey(self, key: int) -> int:
+        """Return the current row of the item with a stable key, or -1."""
+        row = bisect_left(self._keys, key)
+        if row < len(self._keys) and self._keys[row] == key:
+            return row
+        return -1
+
+    def _itemsOfKeys(self, keys: Iterator[int]) -> List[TodoItem]:
+        return [self._items[self.rowOfKey(key)] for key in keys]
+
     def getItemsByCategory(self, category: str) -> List[TodoItem]:
-        """Get all items in a category."""
-        return [self._items[i] for i in self._categories.get(category, [])]
+        """Get all items in a category in row order."""
+        return self._itemsOfKeys(self._index.category_keys(category))
+
+    def getItemsByStatus(self, completed: bool) -> List[TodoItem]:
+        """Get all completed or all pending items in row order."""
+        return self._itemsOfKeys(self._index.status_keys(completed))
+
+    def getItemsDue(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    completed: Optional[bool] = None) -> List[TodoItem]:
+        """Get items due in [start, end) ordered by due date.
+
+        For example getItemsDue(end=when, completed=False) returns the
+        pending items due before when. Only matching items are visited.
+        """
+        return self._itemsOfKeys(self._index.due_keys(start, end, completed))
 
     def getCategories(self) -> List[str]:
-        """Get all categories."""
-        return list(self._categories.keys())
+        """Get all categories that have items, and General."""
+        return list(self._index.categories.keys())
+
+    def enableSearch(self) -> None:
+        """Build the word index used by search() and keep it up to date from now on."""
+        if self._search is None:
+            self._search = TodoSearchIndex()
+            self._search.add_many(self._keys, self._items)
+
+    def search(self, text: str = "", category: Optional[str] = None,
+               completed: Optional[bool] = None) -> np.ndarray:
+        """Return the sorted rows of items matching all given conditions.
+
+        Args:
+            text: Words the title or description must contain; see
+                TodoSearchIndex.search. Empty text matches every item.
+            category: Category the items must have, or None for any.
+            completed: Status the items must have, or None for any.
+        """
+        # Views of the index arrays must not outlive this call, or the arrays cannot grow
+        keys = np.frombuffer(self._keys, dtype=np.int64)
+        candidates = keys
+        if TodoSearchIndex.words(text):
+            self.enableSearch()
+            found = self._search.search(text)
+            candidates = np.fromiter(found, dtype=np.int64, count=len(found))
+
+        if category is not None:
+            code = self._index.category_ids.get(category, -1)
+            codes = np.frombuffer(self._index.category_codes, dtype=np.int64)
+            candidates = candidates[codes[candidates] == code]
+        if completed is not None:
+            flags = np.frombuffer(self._index.completed_of, dtype=np.uint8)
+            candidates = candidates[flags[candidates] == completed]
+
+        if candidates is keys:
+            return np.arange(len(keys))
+        if len(candidates) * 8 < len(keys):
+            candidates.sort()
+            return np.searchsorted(keys, candidates)
+        # Many matches: marking them by key is cheaper than a binary search each
+        marked = np.zeros(len(self._index.category_codes), dtype=bool)
+        marked[candidates] = True
+        return np.flatnonzero(marked[keys])
+
+    def matchRows(self, first: int, last: int, text: str = "", category: Optional[str] = None,
+                  completed: Optional[bool] = None) -> np.ndarray:
+        """Return the rows from first to last, inclusive, matching all given conditions.
+
+        Like search(), but only the given rows are tested, for example
+        rows that were just inserted or changed.
+        """
+        keys = np.array(self._keys[first:last + 1], dtype=np.int64)
+        matched = np.ones(len(keys), dtype=bool)
+        if TodoSearchIndex.words(text):
+            self.enableSearch()
+            found = self._search.search(text)
+            matched &= np.fromiter((key in found for key in keys.tolist()), dtype=bool,
+                                   count=len(keys))
+        if category is not None:
+            code = self._index.category_ids.get(category, -1)
+            codes = np.frombuffer(self._index.category_codes, dtype=np.int64)
+            matched &= codes[keys] == code
+        if completed is not None:
+            flags = np.frombuffer(self._index.completed_of, dtype=np.uint8)
+            matched &= flags[keys] == completed
+        return np.flatnonzero(matched) + first
 
     def clear(self) -> None:
         """Clear all todo items and categories."""
         self.beginResetModel()
         self._items.clear()
-        self._categories = {"General": []}
+        self._due_texts.clear()
+        self._keys = array('q')
+        self._next_key = 0
+        self._index = TodoIndex()
+        self._search = None
+        self.endResetModel()
+
+
+class TodoFilterModel(QAbstractTableModel):
+    """Rows of a TodoModel matching a search text, category and status.
+
+    Matches are looked up in the model's indexes instead of testing every
+    row. They are recomputed when the filter changes or the model is reset
+    or sorted; inserted, removed and changed rows are matched on their own
+    and passed on as inserts and removals. Without a filter rows map one to one and source changes are passed on
+    as they are. Like the other models it derives from QAbstractTableModel
+    rather than QAbstractProxyModel: views call flags() and parent() for
+    every row when laying out, and the table model answers them in C++.
+    """
+
+    def __init__(self, source: TodoModel, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._text = ""
+        self._category: Optional[str] = None
+        self._completed: Optional[bool] = None
+        # Source row of every proxy row, or None while nothing is filtered
+        self._rows: Optional[np.ndarray] = None
+        self._source = source
+        source.rowsAboutToBeInserted.connect(self._sourceRowsAboutToBeInserted)
+        source.rowsInserted.connect(self._sourceRowsInserted)
+        source.rowsAboutToBeRemoved.connect(self._sourceRowsAboutToBeRemoved)
+        source.rowsRemoved.connect(self._sourceRowsRemoved)
+        source.dataChanged.connect(self._sourceDataChanged)
+        source.modelAboutToBeReset.connect(self.beginResetModel)
+        source.modelReset.connect(self._sourceReset)
+        source.layoutChanged.connect(self.refilter)
+
+    def isFiltered(self) -> bool:
+        """Return whether any condition is set."""
+        return bool(TodoSearchIndex.words(self._text)) or self._category is not None \
+            or self._completed is not None
+
+    def setFilter(self, text: str = "", category: Optional[str] = None,
+                  completed: Optional[bool] = None) -> None:
+        """Show only rows matching all given conditions; see TodoModel.search."""
+        self._text = text
+        self._category = category
+        self._completed = completed
+        self.refilter()
+
+    def _match(self) -> Optional[np.ndarray]:
+        if not self.isFiltered():
+            return None
+        return self.sourceModel().search(self._text, self._category, self._completed)
+
+    def refilter(self) -> None:
+        """Recompute the matching rows."""
+        self.beginResetModel()
+        self._rows = self._match()
         self.endResetModel()
+
+    def _sourceReset(self) -> None:
+        self._rows = self._match()
+        self.endResetModel()
+
+    def _sourceRowsAboutToBeInserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _sourceRowsInserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        if self._rows is None:
+            self.endInsertRows()
+            return
+        rows = self._rows
+        position = int(np.searchsorted(rows, first))
+        # Rows below the inserted ones move down
+        shifted = rows[position:] + (last - first + 1)
+        matched = self._matchRows(first, last)
+        if len(matched):
+            self.beginInsertRows(QModelIndex(), position, position + len(matched) - 1)
+        self._rows = np.concatenate((rows[:position], matched, shifted))
+        if len(matched):
+            self.endInsertRows()
+
+    def _sourceRowsAboutToBeRemoved(self, parent: QModelIndex, first: int, last: int) -> None:
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            return
+        start, stop = np.searchsorted(self._rows, [first, last + 1])
+        if start < stop:
+            self.beginRemoveRows(QModelIndex(), int(start), int(stop) - 1)
+
+    def _sourceRowsRemoved(self, parent: QModelIndex, first: int, last: int) -> None:
+        if self._rows is None:
+            self.endRemoveRows()
+            return
+        rows = self._rows
+        start, stop = np.searchsorted(rows, [first, last + 1])
+        self._rows = np.concatenate((rows[:start], rows[stop:] - (last - first + 1)))
+        if start < stop:
+            self.endRemoveRows()
+
+    def _sourceDataChanged(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=()) -> None:
+        if self._rows is None:
+            self.dataChanged.emit(self.index(top_left.row(), top_left.column()),
+                                  self.index(bottom_right.row(), bottom_right.column()))
+            return
+        first, last = top_left.row(), bottom_right.row()
+        rows = self._rows
+        start, stop = (int(position) for position in np.searchsorted(rows, [first, last + 1]))
+        matched = self._matchRows(first, last)
+        if np.array_equal(matched, rows[start:stop]):
+            # Same rows still match: repaint the changed ones and keep the selection
+            if start < stop:
+                self.dataChanged.emit(self.index(start, 0), self.index(stop - 1, len(HEADERS) - 1))
+            return
+        if start < stop:
+            self.beginRemoveRows(QModelIndex(), start, stop - 1)
+            self._rows = np.concatenate((rows[:start], rows[stop:]))
+            self.endRemoveRows()
+        if len(matched):
+            self.beginInsertRows(QModelIndex(), start, start + len(matched) - 1)
+            self._rows = np.concatenate((self._rows[:start], matched, self._rows[start:]))
+            self.endInsertRows()
+
+    def _matchRows(self, first: int, last: int) -> np.ndarray:
+        return self.sourceModel().matchRows(first, last, self._text, self._category,
+                                            self._completed)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of matching rows."""
+        if parent.isValid():
+            return 0
+        if self._rows is None:
+            return self._source.rowCount()
+        return len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of columns."""
+        return len(HEADERS)
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        """Create and return an index for the given row and column."""
+        count = self._source.rowCount() if self._rows is None else len(self._rows)
+        if parent.isValid() or not (0 <= row < count and 0 <= column < len(HEADERS)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def sourceModel(self) -> TodoModel:
+        """Return the filtered model."""
+        return self._source
+
+    def sourceRow(self, row: int) -> int:
+        """Return the source row shown in a proxy row."""
+        if self._rows is None:
+            return row
+        return int(self._rows[row])
+
+    def mapToSource(self, proxy_index: QModelIndex) -> QModelIndex:
+        """Return the source index shown at a proxy index."""
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.sourceRow(proxy_index.row()), proxy_index.column())
+
+    def mapFromSource(self, source_index: QModelIndex) -> QModelIndex:
+        """Return the proxy index showing a source index, or an invalid index if it is hidden."""
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row()
+        if self._rows is not None:
+            position = int(np.searchsorted(self._rows, row))
+            if position == len(self._rows) or self._rows[position] != row:
+                return QModelIndex()
+            row = position
+        return self.index(row, source_index.column())
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        """Return the data of the source row for the given role."""
+        if role != DISPLAY_ROLE:
+            return None
+        row = index.row()
+        if row < 0:
+            return None
+        source = self.sourceModel()
+        return source.data(source.index(self.sourceRow(row), index.column()), role)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        """Return the header data."""
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return None
+
+
+class TodoStore(ABC):
+    """Read-only source of todo items that can be read a page at a time.
+
+    The number of items need not be known in advance, so files can be
+    read incrementally. Stores that know it implement __len__.
+    """
+
+    @abstractmethod
+    def page(self, start: int, stop: int) -> List[TodoItem]:
+        """Return the items with rows in [start, stop); fewer at the end of the store."""
+
+
+class ListStore(TodoStore):
+    """Store over a sequence of items already in memory."""
+
+    def __init__(self, items: Sequence[TodoItem]):
+        self.items = items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def page(self, start: int, stop: int) -> List[TodoItem]:
+        return list(self.items[start:stop])
+
+
+class LazyTodoModel(QAbstractTableModel):
+    """Read-only model showing a TodoStore of any size.
+
+    Rows are exposed in batches through canFetchMore/fetchMore as the view
+    scrolls, or all at once if the store knows its length, and items are
+    read from the store a page at a time. Only the max_pages most recently
+    used pages are kept in memory.
+    """
+
+    def __init__(self, store: TodoStore, page_size: int = 256, max_pages: int = 64,
+                 parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._store = store
+        self._page_size = page_size
+        self._max_pages = max_pages
+        self._fetched = len(store) if isinstance(store, Sized) else 0
+        self._exhausted = isinstance(store, Sized)
+        self._pages: "OrderedDict[int, List[TodoItem]]" = OrderedDict()
+
+    def setStore(self, store: TodoStore) -> None:
+        """Show another store, starting again from its first rows."""
+        self.beginResetModel()
+        self._store = store
+        self._fetched = len(store) if isinstance(store, Sized) else 0
+        self._exhausted = isinstance(store, Sized)
+        self._pages.clear()
+        self.endResetModel()
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of columns."""
+        return len(HEADERS)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of rows fetched so far."""
+        if parent.isValid():
+            return 0
+        return self._fetched
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        """Return whether the store has rows that are not exposed yet."""
+        if parent.isValid():
+            return False
+        return not self._exhausted
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        """Read the next page from the store and expose its rows."""
+        if parent.isValid() or self._exhausted:
+            return
+        page = self._store.page(self._fetched, self._fetched + self._page_size)
+        if len(page) < self._page_size:
+            self._exhausted = True
+        if not page:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + len(page) - 1)
+        self._cachePage(self._fetched // self._page_size, page)
+        self._fetched += len(page)
+        self.endInsertRows()
+
+    def _cachePage(self, number: int, page: List[TodoItem]) -> None:
+        self._pages[number] = page
+        self._pages.move_to_end(number)
+        if len(self._pages) > self._max_pages:
+            self._pages.popitem(last=False)
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        """Create and return an index for the given row and column."""
+        # Checked here because hasIndex() calls back into rowCount() and columnCount()
+        if parent.isValid() or not (0 <= row < self._fetched and 0 <= column < len(HEADERS)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def getItem(self, row: int) -> Optional[TodoItem]:
+        """Get a todo item by row, reading its page from the store if needed."""
+        if not 0 <= row < self._fetched:
+            return None
+        number = row // self._page_size
+        page = self._pages.get(number)
+        if page is None:
+            start = number * self._page_size
+            page = self._store.page(start, start + self._page_size)
+            self._cachePage(number, page)
+        else:
+            self._pages.move_to_end(number)
+        return page[row - number * self._page_size]
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        """Return the data for the given role."""
+        if role != DISPLAY_ROLE or not index.isValid():
+            return None
+        return display_text(self.getItem(index.row()), index.column())
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        """Return the header data."""
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def residentItems(self) -> int:
+        """Return the number of items currently held in memory."""
+        return sum(len(page) for page in self._pages.values())
@@ -0,0 +1,128 @@
+from typing import Callable, Iterable, List
+from dataclasses import asdict
+from datetime import datetime, timedelta
+import json
+import os
+import random
+import tempfile
+import timeit
+import tracemalloc
+
+from file_handler import BINARY_EXTENSION, BinaryStore, FileHandler, JsonArrayStore, item_from_dict
+from task3.todo_model import TodoItem
+
+WORDS = ["review", "report", "call", "buy", "milk", "project", "meeting", "fix", "plan",
+         "email", "garden", "budget", "doctor", "train", "book", "clean", "draft", "pay"]
+
+
+def make_items(count: int) -> List[TodoItem]:
+    """Create reproducible tasks."""
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1, 9, 0)
+    return [TodoItem(title=" ".join(rng.choices(WORDS, k=3)),
+                     description=" ".join(rng.choices(WORDS, k=8)),
+                     due_date=start + timedelta(minutes=rng.randrange(525600)),
+                     completed=rng.random() < 0.3,
+                     category=rng.choice(["General", "Work", "Personal", "Health"]))
+            for _ in range(count)]
+
+
+def measure(function: Callable[[], object], repeat: int = 3) -> float:
+    """Return the best wall time of several runs in seconds."""
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def peak_memory(function: Callable[[], object]) -> float:
+    """Return the peak memory in bytes allocated while function runs."""
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def consume(items: Iterable[TodoItem]) -> None:
+    """Read items without keeping them."""
+    for _ in items:
+        pass
+
+
+def whole_file_save(items: List[TodoItem], filename: str) -> None:
+    """Save items by building the whole document first, as save_json used to."""
+    data = [asdict(item) for item in items]
+    for item in data:
+        item['due_date'] = item['due_date'].isoformat()
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+def whole_file_load(filename: str) -> List[TodoItem]:
+    """Load items by parsing the whole document first, as load_json used to."""
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [item_from_dict(item) for item in data]
+
+
+def report(name: str, count: int, function: Callable[[], object]) -> None:
+    elapsed = measure(function)
+    peak = peak_memory(function)
+    print(f"{name}: {count / elapsed:,.0f} items/s, peak memory {peak / 1e6:.1f} MB")
+
+
+def bench_formats(count: int = 100000) -> None:
+    """Compare whole-document and streaming JSON with NDJSON, writing and reading."""
+    items = make_items(count)
+    with tempfile.TemporaryDirectory() as directory:
+        array_file = os.path.join(directory, "tasks.json")
+        ndjson_file = os.path.join(directory, "tasks.ndjson")
+        FileHandler.save_json(items, array_file)
+        FileHandler.save_ndjson(items, ndjson_file)
+        print(f"formats: {count} items, JSON {os.path.getsize(array_file) / 1e6:.1f} MB, "
+              f"NDJSON {os.path.getsize(ndjson_file) / 1e6:.1f} MB")
+
+        report("  json.dump whole list", count, lambda: whole_file_save(items, array_file))
+        report("  save_json streaming", count, lambda: FileHandler.save_json(items, array_file))
+        report("  save_ndjson", count, lambda: FileHandler.save_ndjson(items, ndjson_file))
+        report("  json.load whole file", count, lambda: whole_file_load(array_file))
+        report("  iter_json", count, lambda: consume(FileHandler.iter_json(array_file)))
+        report("  iter_ndjson", count, lambda: consume(FileHandler.iter_ndjson(ndjson_file)))
+
+
+def open_row(store_type: Callable[[str], object], filename: str, row: int) -> None:
+    """Open a file as a store and read one row."""
+    store = store_type(filename)
+    store.page(row, row + 1)
+    store.close()
+
+
+def bench_binary(count: int = 1000000) -> None:
+    """Compare size, load time and opening at a late row for JSON, NDJSON and the binary format."""
+    items = make_items(count)
+    row = count * 9 // 10
+    with tempfile.TemporaryDirectory() as directory:
+        files = {name: os.path.join(directory, "tasks" + extension) for name, extension in
+                 (("JSON", ".json"), ("NDJSON", ".ndjson"), ("binary", BINARY_EXTENSION))}
+        FileHandler.save_json(items, files["JSON"])
+        FileHandler.save_ndjson(items, files["NDJSON"])
+        FileHandler.save_binary(items, files["binary"])
+        print(f"binary: {count} items, " + ", ".join(
+            f"{name} {os.path.getsize(filename) / 1e6:.1f} MB" for name, filename in files.items()))
+
+        report("  save_binary", count, lambda: FileHandler.save_binary(items, files["binary"]))
+        report("  load_json", count, lambda: FileHandler.load_json(files["JSON"]))
+        report("  load_ndjson", count, lambda: FileHandler.load_ndjson(files["NDJSON"]))
+        report("  load_binary", count, lambda: FileHandler.load_binary(files["binary"]))
+        for name, store_type in (("JSON", JsonArrayStore), ("binary", BinaryStore)):
+            elapsed = measure(lambda: open_row(store_type, files[name], row))
+            print(f"  open {name} and read row {row}: {elapsed * 1000:.2f} ms")
+
+
+def main() -> None:
+    """Run all benchmarks."""
+    bench_formats(10000)
+    bench_formats()
+    bench_binary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import sqlite3
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from PyQt6.QtCore import QModelIndex, QObject, pyqtSignal
+
+from file_handler import TodoDatabase
+from task3.todo_model import TodoItem, TodoModel
+
+
+class TodoDatabaseAdapter(QObject):
+    """Shows the result of a database query in a TodoModel and writes changes back.
+
+    setQuery() filters and sorts in SQL and loads only the matching tasks
+    into the model. From then on every added, changed or removed row is
+    written to the database as it happens; a changed task is a single-row
+    UPDATE. Resetting the model other than by a query, for example by
+    adding tasks to an empty list, replaces the tasks that were shown.
+
+    A write that fails does not raise from the model's signals. The change
+    is not saved, and failed is emitted with the message. Rows added by a
+    failed write have no id, so later changes of them are not saved either.
+    """
+
+    failed = pyqtSignal(str)
+
+    def __init__(self, model: TodoModel, database: TodoDatabase, parent: Optional[QObject] = None):
+        """Show the whole database in model.
+
+        Raises:
+            sqlite3.Error: If the database cannot be read.
+        """
+        super().__init__(parent)
+        self.model = model
+        self.database = database
+        # Database id of the task in each row of the model, or None if it is not saved
+        self.ids: List[Optional[int]] = []
+        self.category: Optional[str] = None
+        self.completed: Optional[bool] = None
+        self.due_from: Optional[datetime] = None
+        self.due_to: Optional[datetime] = None
+        self.order_by = 'id'
+        self.descending = False
+        # Set while the model is filled from a query
+        self._querying = False
+
+        model.rowsInserted.connect(self._rowsInserted)
+        model.rowsAboutToBeRemoved.connect(self._rowsAboutToBeRemoved)
+        model.dataChanged.connect(self._dataChanged)
+        model.modelReset.connect(self._modelReset)
+        self.refresh()
+
+    def close(self) -> None:
+        """Stop writing changes of the model to the database."""
+        self.model.rowsInserted.disconnect(self._rowsInserted)
+        self.model.rowsAboutToBeRemoved.disconnect(self._rowsAboutToBeRemoved)
+        self.model.dataChanged.disconnect(self._dataChanged)
+        self.model.modelReset.disconnect(self._modelReset)
+
+    def setQuery(self, category: Optional[str] = None, completed: Optional[bool] = None,
+                 due_from: Optional[datetime] = None, due_to: Optional[datetime] = None,
+                 order_by: str = 'id', descending: bool = False) -> None:
+        """Show the tasks matching all given conditions; see TodoDatabase.query.
+
+        Raises:
+            sqlite3.Error: If the query fails; the model and the conditions
+                are left unchanged.
+        """
+        if order_by not in TodoDatabase.ORDER_COLUMNS:
+            raise ValueError(f"Cannot sort by {order_by}")
+        self._show(self.database.query(category, completed, due_from, due_to, order_by, descending))
+        self.category = category
+        self.completed = completed
+        self.due_from = due_from
+        self.due_to = due_to
+        self.order_by = order_by
+        self.descending = descending
+
+    def refresh(self) -> None:
+        """Run the query again and show its result.
+
+        Raises:
+            sqlite3.Error: If the query fails; the model is left unchanged.
+        """
+        self._show(self.database.query(self.category, self.completed, self.due_from, self.due_to,
+                                       self.order_by, self.descending))
+
+    def _show(self, rows: Iterable[Tuple[int, TodoItem]]) -> None:
+        rows = list(rows)
+        self._querying = True
+        try:
+            self.model.setItems([item for _, item in rows])
+        finally:
+            self._querying = False
+        self.ids = [id for id, _ in rows]
+
+    def _saved(self, ids: List[Optional[int]]) -> List[int]:
+        return [id for id in ids if id is not None]
+
+    def _rowsInserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        items = [self.model.getItem(row) for row in range(first, last + 1)]
+        try:
+            ids: List[Optional[int]] = self.database.insert(items)
+        except sqlite3.Error as e:
+            ids = [None] * len(items)
+            self.failed.emit(str(e))
+        self.ids[first:first] = ids
+
+    def _rowsAboutToBeRemoved(self, parent: QModelIndex, first: int, last: int) -> None:
+        try:
+            self.database.delete(self._saved(self.ids[first:last + 1]))
+        except sqlite3.Error as e:
+            self.failed.emit(str(e))
+        del self.ids[first:last + 1]
+
+    def _dataChanged(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=()) -> None:
+        try:
+            self.database.update([(self.ids[row], self.model.getItem(row))
+                                  for row in range(top_left.row(), bottom_right.row() + 1)
+                                  if self.ids[row] is not None])
+        except sqlite3.Error as e:
+            self.failed.emit(str(e))
+
+    def _modelReset(self) -> None:
+        if self._querying:
+            return
+        items = self.model.getItems()
+        try:
+            self.ids = self.database.replace(self._saved(self.ids), items)
+        except sqlite3.Error as e:
+            self.ids = [None] * len(items)
+            self.failed.emit(str(e))
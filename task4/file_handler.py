@@ -1,38 +1,291 @@
+import codecs
+import configparser
 import json
+import mmap
+import re
+import sqlite3
+import struct
 import sys
 import os
-from datetime import datetime
-from typing import List
+import xml.dom.minidom
+from array import array
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import List, Dict, Any, BinaryIO, Iterable, Iterator, Optional, Tuple
 from dataclasses import asdict
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from task3.todo_model import TodoItem
+from task3.todo_model import TodoItem, TodoStore
+
+
+def item_from_dict(data: Dict[str, Any]) -> TodoItem:
+    """Build a todo item from its JSON representation."""
+    data['due_date'] = datetime.fromisoformat(data['due_date'])
+    return TodoItem(**data)
+
+
+def item_to_dict(item: TodoItem) -> Dict[str, Any]:
+    """Build the JSON representation of a todo item."""
+    return {'title': item.title, 'description': item.description,
+            'due_date': item.due_date.isoformat(), 'completed': item.completed,
+            'category': item.category}
+
+
+# Whitespace and commas between array items
+SEPARATORS = re.compile(r'[ \t\r\n,]*')
+
+# Binary format, all numbers little-endian: a header, the rows, the table of
+# category names and the byte offset of every row. Each row is a fixed part
+# followed by the UTF-8 title and description.
+BINARY_EXTENSION = '.tdb'
+BINARY_MAGIC = b'TODB'
+BINARY_VERSION = 1
+# Magic, version, reserved, row count, offset of the category table, offset of the row index
+BINARY_HEADER = struct.Struct('<4sHHQQQ')
+# Due date in microseconds since EPOCH, category number, title and description size, completed
+BINARY_ROW = struct.Struct('<qIIIB')
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+SQLITE_EXTENSION = '.sqlite'
+
+
+def iter_json_items(file: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Decode the items of a JSON array from a binary file one at a time.
+
+    Only the undecoded rest of the last chunk read is held in memory, so
+    memory use does not grow with the file unless a single item is larger
+    than a chunk.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    text = ''
+    index = 0
+    started = False
+    at_end = False
+    read_size = chunk_size
+    while True:
+        index = SEPARATORS.match(text, index).end()
+        if index < len(text):
+            if not started:
+                if text[index] != '[':
+                    raise ValueError("JSON file must contain an array of items")
+                started = True
+                index += 1
+                continue
+            if text[index] == ']':
+                return
+            try:
+                item, index = decoder.raw_decode(text, index)
+            except json.JSONDecodeError as e:
+                if at_end:
+                    # Positions in the message would be relative to the text read last
+                    raise ValueError(f"Invalid JSON item: {e.msg}") from e
+                # The item continues in the next chunk; read more at once if it fills the text
+                if index == 0:
+                    read_size *= 2
+            else:
+                yield item
+                continue
+        elif at_end:
+            raise ValueError("Unterminated JSON array" if started
+                             else "JSON file must contain an array of items")
+
+        chunk = file.read(read_size)
+        at_end = not chunk
+        text = text[index:] + utf8.decode(chunk, final=at_end)
+        index = 0
 
 
 class FileHandler:
     """Handler for reading and writing todo items in JSON format."""
 
     @staticmethod
-    def save_json(items: List[TodoItem], filename: str) -> None:
+    def save_json(items: Iterable[TodoItem], filename: str) -> None:
         """Save todo items to a JSON file."""
-        data = [asdict(item) for item in items]
-        for item in data:
-            item['due_date'] = item['due_date'].isoformat()
-
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        for _ in FileHandler.write_json(items, filename):
+            pass
 
     @staticmethod
     def load_json(filename: str) -> List[TodoItem]:
         """Load todo items from a JSON file."""
+        return list(FileHandler.iter_json(filename))
+
+    @staticmethod
+    def iter_json(filename: str) -> Iterator[TodoItem]:
+        """Read todo items from a JSON file one at a time, in constant memory."""
+        with open(filename, 'rb') as f:
+            for data in iter_json_items(f):
+                yield item_from_dict(data)
+
+    @staticmethod
+    def write_json(items: Iterable[TodoItem], filename: str, chunk_size: int = 1000) -> Iterator[int]:
+        """Save todo items to a JSON file, yielding the number written after every chunk.
+
+        Only one chunk of items is encoded at a time. The file is written
+        under a temporary name and renamed when complete, so closing the
+        generator early leaves an existing file as it was.
+        """
+        temporary = filename + '.part'
+        try:
+            with open(temporary, 'w', encoding='utf-8') as f:
+                f.write('[')
+                iterator = iter(items)
+                written = 0
+                while True:
+                    chunk = list(islice(iterator, chunk_size))
+                    if not chunk:
+                        break
+                    text = json.dumps([item_to_dict(item) for item in chunk], indent=4,
+                                      ensure_ascii=False)
+                    # Without the brackets a chunk is laid out as in the whole array
+                    f.write((',' if written else '') + text[1:-2])
+                    written += len(chunk)
+                    yield written
+                f.write('\n]' if written else ']')
+            os.replace(temporary, filename)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @staticmethod
+    def read_json(filename: str, chunk_size: int = 1000) -> Iterator[Tuple[List[TodoItem], float]]:
+        """Load todo items from a JSON file chunk by chunk.
+
+        Yields every chunk with the fraction of the file read so far.
+        """
+        size = max(os.path.getsize(filename), 1)
+        with open(filename, 'rb') as f:
+            items = map(item_from_dict, iter_json_items(f))
+            while True:
+                chunk = list(islice(items, chunk_size))
+                if len(chunk) < chunk_size:
+                    yield chunk, 1.0
+                    return
+                yield chunk, f.tell() / size
+
+    @staticmethod
+    def save_ndjson(items: Iterable[TodoItem], filename: str) -> None:
+        """Save todo items to a newline-delimited JSON file, one item per line."""
+        with open(filename, 'w', encoding='utf-8') as f:
+            for item in items:
+                f.write(json.dumps(item_to_dict(item), ensure_ascii=False) + '\n')
+
+    @staticmethod
+    def load_ndjson(filename: str) -> List[TodoItem]:
+        """Load todo items from a newline-delimited JSON file."""
+        return list(FileHandler.iter_ndjson(filename))
+
+    @staticmethod
+    def iter_ndjson(filename: str) -> Iterator[TodoItem]:
+        """Read todo items from a newline-delimited JSON file one at a time; blank lines are skipped."""
         with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            for number, line in enumerate(f, 1):
+                if line.isspace():
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid item on line {number}: {e}") from e
+                yield item_from_dict(data)
 
-        items = []
-        for item in data:
-            item['due_date'] = datetime.fromisoformat(item['due_date'])
-            items.append(TodoItem(**item))
-        return items
+    @staticmethod
+    def save_binary(items: Iterable[TodoItem], filename: str) -> None:
+        """Save todo items with naive due dates to a binary file read by BinaryStore."""
+        temporary = filename + '.part'
+        categories: Dict[str, int] = {}
+        offsets = array('Q')
+        try:
+            with open(temporary, 'wb') as f:
+                f.write(bytes(BINARY_HEADER.size))
+                position = BINARY_HEADER.size
+                for item in items:
+                    title = item.title.encode('utf-8')
+                    description = item.description.encode('utf-8')
+                    category = categories.setdefault(item.category, len(categories))
+                    row = BINARY_ROW.pack((item.due_date - EPOCH) // MICROSECOND, category,
+                                          len(title), len(description), item.completed)
+                    offsets.append(position)
+                    f.write(row + title + description)
+                    position += len(row) + len(title) + len(description)
+
+                names = [name.encode('utf-8') for name in categories]
+                table = struct.pack(f'<I{len(names)}I', len(names), *map(len, names)) + b''.join(names)
+                f.write(table)
+                if sys.byteorder == 'big':
+                    offsets.byteswap()
+                f.write(offsets.tobytes())
+                f.seek(0)
+                f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(offsets),
+                                           position, position + len(table)))
+            os.replace(temporary, filename)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @staticmethod
+    def load_binary(filename: str) -> List[TodoItem]:
+        """Load todo items from a binary file."""
+        return list(FileHandler.iter_binary(filename))
+
+    @staticmethod
+    def iter_binary(filename: str, chunk_size: int = 1000) -> Iterator[TodoItem]:
+        """Read todo items from a binary file one at a time, decoding a chunk at a time."""
+        store = BinaryStore(filename)
+        try:
+            for start in range(0, len(store), chunk_size):
+                yield from store.page(start, start + chunk_size)
+        finally:
+            store.close()
+
+    @staticmethod
+    def save_sqlite(items: Iterable[TodoItem], filename: str) -> None:
+        """Save todo items to a new SQLite database, replacing the file."""
+        temporary = filename + '.part'
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        try:
+            database = TodoDatabase(temporary)
+            try:
+                database.insert(items)
+            finally:
+                database.close()
+            os.replace(temporary, filename)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @staticmethod
+    def load_sqlite(filename: str) -> List[TodoItem]:
+        """Load todo items from an SQLite database."""
+        return list(FileHandler.iter_sqlite(filename))
+
+    @staticmethod
+    def iter_sqlite(filename: str) -> Iterator[TodoItem]:
+        """Read todo items from an SQLite database one at a time, in the order they were added."""
+        if not os.path.exists(filename):
+            raise ValueError(f"No such database: {filename}")
+        database = TodoDatabase(filename)
+        try:
+            for _, item in database.query():
+                yield item
+        finally:
+            database.close()
+
+    @staticmethod
+    def convert(source: str, target: str) -> None:
+        """Convert a todo file to another format, each chosen by the file extension."""
+        readers = {'.json': FileHandler.iter_json, '.ndjson': FileHandler.iter_ndjson,
+                   '.xml': FileHandler.load_xml, '.ini': FileHandler.load_ini,
+                   BINARY_EXTENSION: FileHandler.iter_binary, SQLITE_EXTENSION: FileHandler.iter_sqlite}
+        writers = {'.json': FileHandler.save_json, '.ndjson': FileHandler.save_ndjson,
+                   '.xml': FileHandler.save_xml, '.ini': FileHandler.save_ini,
+                   BINARY_EXTENSION: FileHandler.save_binary, SQLITE_EXTENSION: FileHandler.save_sqlite}
+        source_format = os.path.splitext(source)[1].lower()
+        target_format = os.path.splitext(target)[1].lower()
+        if source_format not in readers or target_format not in writers:
+            raise ValueError(f"Cannot convert {source_format or source} to {target_format or target}")
+        writers[target_format](readers[source_format](source), target)
 
     @staticmethod
     def save_xml(items: List[TodoItem], filename: str) -> None:
@@ -67,7 +320,7 @@ class FileHandler:
             for child in todo.childNodes:
                 if child.nodeType == xml.dom.Node.ELEMENT_NODE:
                     key = child.tagName
-                    value = child.firstChild.nodeValue
+                    value = child.firstChild.nodeValue if child.firstChild else ''
                     if key == 'due_date':
                         value = datetime.fromisoformat(value)
                     elif key == 'completed':
@@ -78,29 +331,332 @@ class FileHandler:
 
     @staticmethod
     def save_ini(items: List[TodoItem], filename: str) -> None:
-        """Save todo items to an INI file."""
-        config = configparser.ConfigParser()
+        """Save todo items to an INI file.
+
+        Texts are stored as JSON strings, since INI values lose surrounding
+        whitespace and the indentation of continuation lines.
+        """
+        config = configparser.ConfigParser(interpolation=None)
 
         for i, item in enumerate(items):
-            section = f'todo_{i}'
-            config[section] = asdict(item)
-            config[section]['due_date'] = item.due_date.isoformat()
-            config[section]['completed'] = str(item.completed).lower()
+            config[f'todo_{i}'] = {
+                'title': json.dumps(item.title, ensure_ascii=False),
+                'description': json.dumps(item.description, ensure_ascii=False),
+                'due_date': item.due_date.isoformat(),
+                'completed': str(item.completed).lower(),
+                'category': json.dumps(item.category, ensure_ascii=False),
+            }
 
         with open(filename, 'w', encoding='utf-8') as f:
             config.write(f)
 
+    @staticmethod
+    def ini_text(value: str) -> str:
+        """Decode a text saved by save_ini; plain text from older files is kept as it is."""
+        if value.startswith('"'):
+            try:
+                text = json.loads(value)
+            except ValueError:
+                return value
+            if isinstance(text, str):
+                return text
+        return value
+
     @staticmethod
     def load_ini(filename: str) -> List[TodoItem]:
         """Load todo items from an INI file."""
-        config = configparser.ConfigParser()
+        config = configparser.ConfigParser(interpolation=None)
         config.read(filename, encoding='utf-8')
 
         items = []
         for section in config.sections():
             item_data = dict(config[section])
+            for key in ('title', 'description', 'category'):
+                if key in item_data:
+                    item_data[key] = FileHandler.ini_text(item_data[key])
             item_data['due_date'] = datetime.fromisoformat(
                 item_data['due_date'])
             item_data['completed'] = item_data['completed'].lower() == 'true'
             items.append(TodoItem(**item_data))
         return items
+
+
+class JsonArrayStore(TodoStore):
+    """Pageable read-only view of a JSON file written by FileHandler.save_json.
+
+    The file is decoded incrementally: reading a page decodes only the
+    items up to its end, and the byte offset of every item seen is kept,
+    so pages dropped from memory can be decoded again without rescanning.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, filename: str):
+        self.file = open(filename, 'rb')
+        self.decoder = json.JSONDecoder()
+        # Byte offset of the first character of every item found so far
+        self.offsets = array('q')
+        self.complete = False
+
+        head = self.file.read(self.CHUNK_SIZE)
+        stripped = head.lstrip()
+        if not stripped.startswith(b'['):
+            self.file.close()
+            raise ValueError("JSON file must contain an array of items")
+        # Where scanning for the item after the last known one continues
+        self.scan_position = len(head) - len(stripped) + 1
+
+    def close(self) -> None:
+        self.file.close()
+
+    def read_text(self, position: int, size: int) -> tuple:
+        """Read and decode up to size bytes; return the text and whether the file ended."""
+        self.file.seek(position)
+        window = self.file.read(size)
+        try:
+            text = window.decode('utf-8')
+        except UnicodeDecodeError as e:
+            # A character split by the end of the window is read next time
+            if e.start < len(window) - 3:
+                raise
+            text = window[:e.start].decode('utf-8')
+        return text, len(window) < size
+
+    def page(self, start: int, stop: int) -> List[TodoItem]:
+        """Return the items with rows in [start, stop), decoding as far as needed."""
+        items: List[TodoItem] = []
+        row = min(start, len(self.offsets))
+        if row < len(self.offsets):
+            position = self.offsets[row]
+        elif self.complete:
+            return items
+        else:
+            position = self.scan_position
+
+        size = self.CHUNK_SIZE
+        text, at_end = self.read_text(position, size)
+        index = 0
+        while row < stop:
+            # position is the byte offset of text[index]
+            while index < len(text) and text[index] in ' \t\r\n,':
+                index += 1
+                position += 1
+            if index == len(text):
+                if at_end:
+                    raise ValueError("Unterminated JSON array")
+                text, at_end = self.read_text(position, size)
+                index = 0
+                continue
+            if text[index] == ']':
+                self.complete = True
+                break
+
+            try:
+                data, end = self.decoder.raw_decode(text, index)
+            except json.JSONDecodeError:
+                if index == 0:
+                    # The item does not fit into the window
+                    if at_end:
+                        raise
+                    size *= 2
+                text, at_end = self.read_text(position, size)
+                index = 0
+                continue
+
+            if row == len(self.offsets):
+                self.offsets.append(position)
+            if row >= start:
+                items.append(item_from_dict(data))
+            row += 1
+            position += len(text[index:end].encode('utf-8'))
+            index = end
+
+        if row == len(self.offsets) and not self.complete:
+            self.scan_position = position
+        return items
+
+
+class BinaryStore(TodoStore):
+    """Random-access view of a binary file written by FileHandler.save_binary.
+
+    The file is mapped into memory and a row is decoded only when it is
+    read, so opening the file and reading any row takes constant time.
+    """
+
+    def __init__(self, filename: str):
+        with open(filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < BINARY_HEADER.size:
+                raise ValueError("Not a binary todo file")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, self.count, categories_offset, self.index_offset = \
+                BINARY_HEADER.unpack_from(self.map)
+            if magic != BINARY_MAGIC:
+                raise ValueError("Not a binary todo file")
+            if version != BINARY_VERSION:
+                raise ValueError(f"Unsupported binary todo file version {version}")
+            if self.index_offset + 8 * self.count != len(self.map):
+                raise ValueError("Truncated binary todo file")
+            count, = struct.unpack_from('<I', self.map, categories_offset)
+            sizes = struct.unpack_from(f'<{count}I', self.map, categories_offset + 4)
+            position = categories_offset + 4 + 4 * count
+            self.categories: List[str] = []
+            for size in sizes:
+                self.categories.append(self.map[position:position + size].decode('utf-8'))
+                position += size
+        except (struct.error, UnicodeDecodeError) as e:
+            self.map.close()
+            raise ValueError(f"Invalid binary todo file: {e}") from e
+        except ValueError:
+            self.map.close()
+            raise
+
+    def close(self) -> None:
+        self.map.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def page(self, start: int, stop: int) -> List[TodoItem]:
+        """Return the items with rows in [start, stop), decoding only those."""
+        stop = min(stop, self.count)
+        if start >= stop:
+            return []
+        data = self.map
+        categories = self.categories
+        unpack_row = BINARY_ROW.unpack_from
+        row_size = BINARY_ROW.size
+        items = []
+        for offset in struct.unpack_from(f'<{stop - start}Q', data, self.index_offset + 8 * start):
+            due, category, title_size, description_size, completed = unpack_row(data, offset)
+            title_end = offset + row_size + title_size
+            items.append(TodoItem(data[offset + row_size:title_end].decode('utf-8'),
+                                  data[title_end:title_end + description_size].decode('utf-8'),
+                                  EPOCH + due * MICROSECOND, bool(completed), categories[category]))
+        return items
+
+
+class TodoDatabase:
+    """Todo items stored in an SQLite database file.
+
+    Every item has an integer id. Category, status and due date are
+    indexed, so query() filters and sorts in SQL, and an item is changed
+    or removed by id without touching the others.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS todos (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            due_date INTEGER NOT NULL,  -- Microseconds since 1970-01-01
+            completed INTEGER NOT NULL,
+            category TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS todos_category ON todos (category, due_date);
+        CREATE INDEX IF NOT EXISTS todos_completed ON todos (completed, due_date);
+        CREATE INDEX IF NOT EXISTS todos_due_date ON todos (due_date);
+    """
+
+    # Columns query() can sort by
+    ORDER_COLUMNS = ('id', 'title', 'description', 'due_date', 'completed', 'category')
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM todos").fetchone()[0]
+
+    @staticmethod
+    def row(item: TodoItem) -> tuple:
+        """Return the column values of an item after its id."""
+        return (item.title, item.description, (item.due_date - EPOCH) // MICROSECOND,
+                item.completed, item.category)
+
+    def insert(self, items: Iterable[TodoItem], chunk_size: int = 1000) -> List[int]:
+        """Add items in a single transaction, a chunk per statement, and return their ids."""
+        with self.connection:
+            return self._insert(items, chunk_size)
+
+    def _insert(self, items: Iterable[TodoItem], chunk_size: int = 1000) -> List[int]:
+        next_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM todos").fetchone()[0]
+        ids: List[int] = []
+        iterator = iter(items)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return ids
+            self.connection.executemany(
+                "INSERT INTO todos VALUES (?, ?, ?, ?, ?, ?)",
+                [(next_id + i, *self.row(item)) for i, item in enumerate(chunk)])
+            ids.extend(range(next_id, next_id + len(chunk)))
+            next_id += len(chunk)
+
+    def update(self, updates: Iterable[Tuple[int, TodoItem]]) -> None:
+        """Write changed items given with their ids, one single-row UPDATE each."""
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE todos SET title = ?, description = ?, due_date = ?, completed = ?, "
+                "category = ? WHERE id = ?",
+                [(*self.row(item), id) for id, item in updates])
+
+    def delete(self, ids: Iterable[int]) -> None:
+        """Remove the items with the given ids."""
+        with self.connection:
+            self._delete(ids)
+
+    def _delete(self, ids: Iterable[int]) -> None:
+        self.connection.executemany("DELETE FROM todos WHERE id = ?", [(id,) for id in ids])
+
+    def replace(self, ids: Iterable[int], items: Iterable[TodoItem]) -> List[int]:
+        """Remove the items with the given ids and add items in one transaction; return the new ids."""
+        with self.connection:
+            self._delete(ids)
+            return self._insert(items)
+
+    def categories(self) -> List[str]:
+        """Return the categories of all items, sorted."""
+        return [category for category, in self.connection.execute(
+            "SELECT DISTINCT category FROM todos ORDER BY category")]
+
+    def query(self, category: Optional[str] = None, completed: Optional[bool] = None,
+              due_from: Optional[datetime] = None, due_to: Optional[datetime] = None,
+              order_by: str = 'id', descending: bool = False) -> Iterator[Tuple[int, TodoItem]]:
+        """Return the ids and items matching all given conditions, sorted in SQL.
+
+        Args:
+            category: Only items in this category.
+            completed: Only completed or only pending items.
+            due_from: Only items due at or after this time.
+            due_to: Only items due before this time.
+            order_by: Column to sort by, one of ORDER_COLUMNS; ties are in id order.
+            descending: Whether to sort in descending order.
+        """
+        if order_by not in self.ORDER_COLUMNS:
+            raise ValueError(f"Cannot sort by {order_by}")
+        conditions = []
+        parameters: List[Any] = []
+        if category is not None:
+            conditions.append("category = ?")
+            parameters.append(category)
+        if completed is not None:
+            conditions.append("completed = ?")
+            parameters.append(completed)
+        if due_from is not None:
+            conditions.append("due_date >= ?")
+            parameters.append((due_from - EPOCH) // MICROSECOND)
+        if due_to is not None:
+            conditions.append("due_date < ?")
+            parameters.append((due_to - EPOCH) // MICROSECOND)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        direction = " DESC" if descending else ""
+        cursor = self.connection.execute(
+            f"SELECT * FROM todos{where} ORDER BY {order_by}{direction}, id", parameters)
+        for id, title, description, due, completed_value, category_value in cursor:
+            yield id, TodoItem(title, description, EPOCH + due * MICROSECOND, bool(completed_value),
+                               category_value)
@@ -0,0 +1,90 @@
+from abc import ABC, ABCMeta, abstractmethod
+from contextlib import closing
+from typing import List, Optional
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from file_handler import FileHandler
+from task3.todo_model import TodoItem
+
+
+class FileWorkerMeta(type(QThread), ABCMeta):
+    """Metaclass letting a QThread subclass have abstract methods."""
+
+
+class FileWorker(QThread, ABC, metaclass=FileWorkerMeta):
+    """Thread reading or writing a todo file while the window stays responsive.
+
+    Signals are received in the thread that created the worker. Calling
+    requestInterruption() cancels the operation after the current chunk.
+    The built-in finished signal is emitted in every case; completed and
+    error tell how the operation ended.
+    """
+
+    progress = pyqtSignal(int)
+
+    def __init__(self, filename: str, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.filename = filename
+        self.completed = False
+        self.error: Optional[str] = None
+
+    def run(self) -> None:
+        try:
+            self.completed = self.work()
+        except Exception as e:
+            self.error = str(e)
+
+    @abstractmethod
+    def work(self) -> bool:
+        """Do the operation; return False if it was cancelled."""
+        pass
+
+
+class LoadWorker(FileWorker):
+    """Reads tasks from a JSON file and hands them over in growing batches.
+
+    Every batch is at least as large as all batches before it together,
+    so a view that lays out all its rows per insert does linear work in
+    total while the first tasks still show up at once.
+    """
+
+    loaded = pyqtSignal(list)
+
+    def __init__(self, filename: str, chunk_size: int = 1000, parent: Optional[QObject] = None):
+        super().__init__(filename, parent)
+        self.chunk_size = chunk_size
+        self.count = 0
+
+    def work(self) -> bool:
+        pending: List[TodoItem] = []
+        with closing(FileHandler.read_json(self.filename, self.chunk_size)) as chunks:
+            for items, fraction in chunks:
+                if self.isInterruptionRequested():
+                    return False
+                pending.extend(items)
+                if len(pending) >= max(self.chunk_size, self.count):
+                    self.count += len(pending)
+                    self.loaded.emit(pending)
+                    pending = []
+                self.progress.emit(int(fraction * 100))
+        if pending:
+            self.count += len(pending)
+            self.loaded.emit(pending)
+        return True
+
+
+class SaveWorker(FileWorker):
+    """Writes tasks to a JSON file; a cancelled save leaves the file as it was."""
+
+    def __init__(self, items: List[TodoItem], filename: str, parent: Optional[QObject] = None):
+        super().__init__(filename, parent)
+        self.items = items
+
+    def work(self) -> bool:
+        with closing(FileHandler.write_json(self.items, self.filename)) as chunks:
+            for written in chunks:
+                if self.isInterruptionRequested():
+                    return False
+                self.progress.emit(written * 100 // max(len(self.items), 1))
+        return True
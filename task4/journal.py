@@ -0,0 +1,303 @@
+import json
+import os
+import threading
+from array import array
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PyQt6.QtCore import QModelIndex, QObject, pyqtSignal
+
+from file_handler import item_from_dict, item_to_dict
+from task3.todo_model import TodoItem, TodoModel
+
+JOURNAL_SUFFIX = '.journal'
+
+
+def write_atomically(filename: str, lines: Iterable[bytes], sync: bool = True) -> int:
+    """Write lines under a temporary name and rename it to filename; return the size written.
+
+    With sync the data is on disk before the rename and the rename before
+    returning, so after a crash filename holds either the old or the new
+    content.
+    """
+    temporary = filename + '.part'
+    try:
+        with open(temporary, 'wb') as f:
+            f.writelines(lines)
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(temporary, filename)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    if sync and os.name == 'posix':
+        directory = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+    return size
+
+
+def encode(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def read_journal(filename: str) -> Tuple[List[int], List[TodoItem], int, int]:
+    """Replay a snapshot and its journal.
+
+    Returns the keys and items in row order, the number of the last
+    record applied and the size of the journal up to its last complete
+    record.
+    """
+    items: Dict[int, TodoItem] = {}
+    seq = 0
+    if os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            try:
+                seq = json.loads(f.readline())['seq']
+                for line in f:
+                    record = json.loads(line)
+                    items[record['key']] = item_from_dict(record['item'])
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"Invalid snapshot {filename}: {e}") from e
+
+    size = 0
+    journal = filename + JOURNAL_SUFFIX
+    if os.path.exists(journal):
+        with open(journal, 'rb') as f:
+            for number, line in enumerate(f, 1):
+                if not line.endswith(b'\n'):
+                    # The last record was only partly written before a crash
+                    break
+                try:
+                    record = json.loads(line)
+                    # Records up to seq are in the snapshot already
+                    if record['seq'] > seq:
+                        seq = record['seq']
+                        if record['op'] == 'remove':
+                            items.pop(record['key'], None)
+                        else:
+                            items[record['key']] = item_from_dict(record['item'])
+                except (ValueError, KeyError) as e:
+                    raise ValueError(f"Invalid journal record on line {number}: {e}") from e
+                size += len(line)
+
+    keys = sorted(items)
+    return keys, [items[key] for key in keys], seq, size
+
+
+class TodoJournal(QObject):
+    """Saves every change of a TodoModel as it happens.
+
+    The tasks are kept in a snapshot file plus a journal next to it with
+    the extension .journal. Each added, changed or removed task appends
+    one line to the journal and syncs it, so saving costs time in
+    proportion to the change rather than to the list. Once the journal
+    grows past compact_size bytes, a background thread writes the whole
+    list to a new snapshot and the journal starts over; resetting the
+    model writes a new snapshot at once.
+
+    Both files hold one JSON object per line. The snapshot starts with
+    {"seq": n}, the number of the last journal record it contains, and
+    has one {"key": k, "item": {...}} per task. Journal records are
+    {"seq": n, "op": "add" | "update" | "remove", "key": k, "item": {...}}.
+    Snapshots are replaced atomically and records they contain are skipped
+    when replaying, so a crash at any point loses at most the records
+    being written.
+
+    A failed write does not raise from the model's signals. It sets error,
+    and the next change starts a compaction that saves the whole list
+    again. failed is emitted with the message of the first failure, and
+    again only once a compaction has succeeded in between; it may come
+    from the compaction thread.
+    """
+
+    failed = pyqtSignal(str)
+
+    def __init__(self, model: TodoModel, filename: str, compact_size: int = 1 << 20,
+                 sync: bool = True, parent: Optional[QObject] = None):
+        """Open a journal and start recording changes of model.
+
+        If filename exists the model is loaded from it; otherwise a new
+        snapshot of the items in the model is written.
+
+        Args:
+            model: Model to keep saved.
+            filename: Name of the snapshot file.
+            compact_size: Journal size in bytes that starts a compaction.
+            sync: Whether to sync every write to disk, which makes writes
+                crash-safe but slower.
+            parent: Parent object.
+
+        Raises:
+            OSError: If the files cannot be read or written.
+            ValueError: If the files are not valid.
+        """
+        super().__init__(parent)
+        self.model = model
+        self.filename = filename
+        self.journal_name = filename + JOURNAL_SUFFIX
+        self.compact_size = compact_size
+        self.sync = sync
+        # Message of the last failed write
+        self.error: Optional[str] = None
+        # Set while the files may lack changes after a failed write
+        self._stale = False
+        # Guards the journal file and the records kept during a compaction
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        # Records appended since the running compaction started
+        self._pending: Optional[List[bytes]] = None
+        self._file = None
+
+        if os.path.exists(filename):
+            keys, items, self.seq, self.size = read_journal(filename)
+            model.setItems(items, keys)
+            self._file = open(self.journal_name, 'ab')
+            # Drop a partly written last record so new ones start on their own line
+            self._file.truncate(self.size)
+        else:
+            self.seq = 0
+            self.size = 0
+            self._write_snapshot(model.getKeys(), model.getItems(), self.seq)
+
+        model.rowsInserted.connect(self._rowsInserted)
+        model.rowsAboutToBeRemoved.connect(self._rowsAboutToBeRemoved)
+        model.rowsRemoved.connect(self._rowsRemoved)
+        model.dataChanged.connect(self._dataChanged)
+        model.modelReset.connect(self._modelReset)
+
+    def close(self) -> None:
+        """Stop recording changes and close the journal after a running compaction."""
+        self.model.rowsInserted.disconnect(self._rowsInserted)
+        self.model.rowsAboutToBeRemoved.disconnect(self._rowsAboutToBeRemoved)
+        self.model.rowsRemoved.disconnect(self._rowsRemoved)
+        self.model.dataChanged.disconnect(self._dataChanged)
+        self.model.modelReset.disconnect(self._modelReset)
+        self.wait()
+        self._file.close()
+
+    def wait(self) -> None:
+        """Wait until a running compaction is done."""
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def compact(self, wait: bool = False) -> None:
+        """Write all items to a new snapshot and empty the journal.
+
+        Without wait the snapshot is written in a background thread,
+        unless a compaction is running already. Failures are reported
+        through error and failed.
+        """
+        if self._compactor is not None:
+            if not wait and self._compactor.is_alive():
+                return
+            self.wait()
+        # Items are copied here since the model may change while the snapshot is written
+        arguments = (self.model.getKeys(), self.model.getItems(), self.seq)
+        with self._lock:
+            self._pending = []
+        if wait:
+            self._compact(*arguments)
+        else:
+            self._compactor = threading.Thread(target=self._compact, args=arguments, daemon=True)
+            self._compactor.start()
+
+    def _compact(self, keys: array, items: List[TodoItem], seq: int) -> None:
+        try:
+            self._write_snapshot(keys, items, seq)
+        except Exception as e:
+            # The journal still holds the changes it could save; the next change tries again
+            with self._lock:
+                self._pending = None
+            self._fail(e)
+
+    def _write_snapshot(self, keys: array, items: List[TodoItem], seq: int) -> None:
+        lines = (encode({'key': key, 'item': item_to_dict(item)}) for key, item in zip(keys, items))
+        write_atomically(self.filename, chain([encode({'seq': seq})], lines), self.sync)
+        with self._lock:
+            # A crash before the journal is replaced replays it on top of the new snapshot,
+            # skipping the records the snapshot contains
+            pending = self._pending or []
+            self.size = write_atomically(self.journal_name, pending, self.sync)
+            self._pending = None
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.journal_name, 'ab')
+            self._stale = False
+            self.error = None
+
+    def _append(self, records: List[dict]) -> None:
+        lines = []
+        for record in records:
+            self.seq += 1
+            lines.append(encode({'seq': self.seq, **record}))
+        data = b''.join(lines)
+        with self._lock:
+            if self._pending is not None:
+                # The running compaction writes them to the new journal even if this write fails
+                self._pending.extend(lines)
+            try:
+                self._file.write(data)
+                self._file.flush()
+                if self.sync:
+                    os.fsync(self._file.fileno())
+                self.size += len(data)
+                return
+            except Exception as e:
+                error = e
+                self._stale = True
+                self._reopen()
+        self._fail(error)
+
+    def _reopen(self) -> None:
+        """Reopen the journal without a partly written last record."""
+        try:
+            try:
+                self._file.close()
+            finally:
+                self._file = open(self.journal_name, 'ab')
+                self._file.truncate(self.size)
+        except Exception:
+            # Writes fail until a compaction replaces the journal
+            pass
+
+    def _fail(self, error: Exception) -> None:
+        # Only the first of a series of failures is reported; a successful compaction ends it
+        reported = self.error is not None
+        self.error = str(error)
+        if not reported:
+            self.failed.emit(self.error)
+
+    def _compactIfDue(self) -> None:
+        # Called once a change is complete, so that a snapshot includes it
+        if self.size > self.compact_size or self._stale:
+            self.compact()
+
+    def _records(self, op: str, first: int, last: int) -> List[dict]:
+        model = self.model
+        if op == 'remove':
+            return [{'op': op, 'key': model.keyOfRow(row)} for row in range(first, last + 1)]
+        return [{'op': op, 'key': model.keyOfRow(row), 'item': item_to_dict(model.getItem(row))}
+                for row in range(first, last + 1)]
+
+    def _rowsInserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        self._append(self._records('add', first, last))
+        self._compactIfDue()
+
+    def _rowsAboutToBeRemoved(self, parent: QModelIndex, first: int, last: int) -> None:
+        self._append(self._records('remove', first, last))
+
+    def _rowsRemoved(self, parent: QModelIndex, first: int, last: int) -> None:
+        self._compactIfDue()
+
+    def _dataChanged(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=()) -> None:
+        self._append(self._records('update', top_left.row(), bottom_right.row()))
+        self._compactIfDue()
+
+    def _modelReset(self) -> None:
+        self.compact(wait=True)
@@ -1,17 +1,25 @@
-from file_handler import FileHandler
+from database import TodoDatabaseAdapter
+from file_handler import BINARY_EXTENSION, SQLITE_EXTENSION, BinaryStore, JsonArrayStore, TodoDatabase
+from file_worker import FileWorker, LoadWorker, SaveWorker
+from journal import TodoJournal
 from task3.todo_delegate import TodoDelegate
-from task3.todo_model import TodoModel, TodoItem
+from task3.todo_model import TodoModel, TodoItem, TodoFilterModel, LazyTodoModel, TodoStore
 import sys
 import os
+import sqlite3
 from datetime import datetime
+from typing import List, Optional
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLineEdit, QTextEdit,
                              QDateTimeEdit, QComboBox, QTreeView, QMessageBox,
-                             QFileDialog)
+                             QFileDialog, QAbstractItemView, QProgressBar)
 from PyQt6.QtCore import Qt
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Database column sorted by when a header is clicked, per view column
+SORT_COLUMNS = ['title', 'description', 'due_date', 'completed']
+
 
 class TodoView(QMainWindow):
     """Main window for the todo application with JSON file handling."""
@@ -23,6 +31,16 @@ class TodoView(QMainWindow):
 
         
         self.model = TodoModel()
+        self.proxy = TodoFilterModel(self.model, self)
+        # Store shown instead of the model while browsing a file
+        self.browse_store: Optional[TodoStore] = None
+        # Running load or save, and the tasks to restore if a load does not complete
+        self.file_worker: Optional[FileWorker] = None
+        self.previous_items: List[TodoItem] = []
+        # Journal saving every change, if one is open
+        self.journal: Optional[TodoJournal] = None
+        # Database the tasks are shown from and saved to, if one is open
+        self.database: Optional[TodoDatabaseAdapter] = None
 
       
         central_widget = QWidget()
@@ -41,6 +59,18 @@ class TodoView(QMainWindow):
         load_btn.clicked.connect(self.load_file)
         file_layout.addWidget(load_btn)
 
+        browse_btn = QPushButton("Browse File (read-only)")
+        browse_btn.clicked.connect(self.browse_file)
+        file_layout.addWidget(browse_btn)
+
+        journal_btn = QPushButton("Open Journal")
+        journal_btn.clicked.connect(self.open_journal)
+        file_layout.addWidget(journal_btn)
+
+        database_btn = QPushButton("Open Database")
+        database_btn.clicked.connect(self.open_database)
+        file_layout.addWidget(database_btn)
+
         layout.addLayout(file_layout)
 
       
@@ -62,6 +92,7 @@ class TodoView(QMainWindow):
         self.category_input = QComboBox()
         self.category_input.setEditable(True)
         self.category_input.addItem("General")
+        self.categories = {"General"}
         form_layout.addWidget(self.category_input)
 
         add_button = QPushButton("Add Task")
@@ -70,10 +101,32 @@ class TodoView(QMainWindow):
 
         layout.addLayout(form_layout)
 
+        filter_layout = QHBoxLayout()
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search tasks")
+        self.search_input.textChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.search_input)
+
+        self.status_filter = QComboBox()
+        self.status_filter.addItems(["All", "Pending", "Completed"])
+        self.status_filter.currentIndexChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.status_filter)
+
+        self.category_filter = QComboBox()
+        self.category_filter.addItems(["All categories", "General"])
+        self.category_filter.currentIndexChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.category_filter)
+
+        layout.addLayout(filter_layout)
+
         self.tree_view = QTreeView()
-        self.tree_view.setModel(self.model)
+        self.tree_view.setModel(self.proxy)
         self.tree_view.setItemDelegate(TodoDelegate())
         self.tree_view.setAlternatingRowColors(True)
+        self.tree_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.tree_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tree_view.header().sectionClicked.connect(self.sort_by_column)
         layout.addWidget(self.tree_view)
 
         button_layout = QHBoxLayout()
@@ -87,7 +140,19 @@ class TodoView(QMainWindow):
         button_layout.addWidget(delete_button)
 
         layout.addLayout(button_layout)
-        
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_file_operation)
+        self.statusBar().addPermanentWidget(self.cancel_button)
+
+        # Disabled while a file is loaded or saved
+        self.busy_widgets = [save_btn, load_btn, browse_btn, journal_btn, database_btn, add_button,
+                             complete_button, delete_button]
+        self.set_busy(False)
+
         self.add_sample_tasks()
 
     def add_task(self):
@@ -101,6 +166,8 @@ class TodoView(QMainWindow):
             QMessageBox.warning(self, "Warning", "Title cannot be empty!")
             return
 
+        self.show_model()
+
         item = TodoItem(
             title=title,
             description=description,
@@ -110,9 +177,50 @@ class TodoView(QMainWindow):
 
         self.model.addItem(item)
         self.clear_inputs()
-
-        if category not in [self.category_input.itemText(i) for i in range(self.category_input.count())]:
-            self.category_input.addItem(category)
+        self.add_categories([category])
+
+    def add_categories(self, categories):
+        """Add categories not offered yet to the category box."""
+        for category in categories:
+            if category not in self.categories:
+                self.categories.add(category)
+                self.category_input.addItem(category)
+                self.category_filter.addItem(category)
+
+    def apply_filter(self):
+        """Show only tasks matching the search text, status and category filters."""
+        status = self.status_filter.currentIndex()
+        completed = None if status == 0 else status == 2
+        category = self.category_filter.currentText() if self.category_filter.currentIndex() > 0 else None
+        if self.database is not None:
+            # Status and category are filtered in SQL, only the search text here
+            database = self.database
+            if (category, completed) != (database.category, database.completed):
+                try:
+                    database.setQuery(category, completed, order_by=database.order_by,
+                                      descending=database.descending)
+                except sqlite3.Error as e:
+                    QMessageBox.critical(self, "Error", f"Failed to query database: {str(e)}")
+            self.proxy.setFilter(self.search_input.text())
+        else:
+            self.proxy.setFilter(self.search_input.text(), category, completed)
+
+    def sort_by_column(self, column: int):
+        """Sort the tasks of an open database by a column in SQL, reversing on a second click."""
+        if self.database is None:
+            return
+        order_by = SORT_COLUMNS[column]
+        descending = order_by == self.database.order_by and not self.database.descending
+        try:
+            self.database.setQuery(self.database.category, self.database.completed,
+                                   order_by=order_by, descending=descending)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Failed to query database: {str(e)}")
+            return
+        header = self.tree_view.header()
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(column, Qt.SortOrder.DescendingOrder if descending
+                                else Qt.SortOrder.AscendingOrder)
 
     def clear_inputs(self):
         """Clear all input fields."""
@@ -121,26 +229,27 @@ class TodoView(QMainWindow):
         self.due_date_input.setDateTime(datetime.now())
         self.category_input.setCurrentText("General")
 
+    def selected_rows(self):
+        """Return the distinct model rows with a selected cell."""
+        return sorted({self.proxy.mapToSource(index).row()
+                       for index in self.tree_view.selectedIndexes()})
+
     def mark_completed(self):
-        """Mark selected task as completed."""
-        indexes = self.tree_view.selectedIndexes()
-        if not indexes:
+        """Mark selected tasks as completed."""
+        if self.is_browsing():
             return
-
-        row = indexes[0].row()
-        item = self.model.getItem(row)
-        if item:
+        updates = []
+        for row in self.selected_rows():
+            item = self.model.getItem(row)
             item.completed = True
-            self.model.updateItem(row, item)
+            updates.append((row, item))
+        self.model.updateItems(updates)
 
     def delete_task(self):
-        """Delete selected task."""
-        indexes = self.tree_view.selectedIndexes()
-        if not indexes:
+        """Delete selected tasks."""
+        if self.is_browsing():
             return
-
-        row = indexes[0].row()
-        self.model.removeItem(row)
+        self.model.removeItems(self.selected_rows())
 
     def add_sample_tasks(self):
         """Add some sample tasks to demonstrate the application."""
@@ -166,10 +275,8 @@ class TodoView(QMainWindow):
             )
         ]
 
-        for task in sample_tasks:
-            self.model.addItem(task)
-            if task.category not in [self.category_input.itemText(i) for i in range(self.category_input.count())]:
-                self.category_input.addItem(task.category)
+        self.model.addItems(sample_tasks)
+        self.add_categories({task.category for task in sample_tasks})
 
     def save_file(self):
         """Save tasks to a JSON file."""
@@ -182,11 +289,8 @@ class TodoView(QMainWindow):
             )
 
             if filename:
-                items = [self.model.getItem(i)
-                         for i in range(self.model.rowCount())]
-                FileHandler.save_json(items, filename)
-                QMessageBox.information(
-                    self, "Success", f"Tasks saved to {filename}")
+                self.start_file_operation(
+                    SaveWorker(self.model.getItems(), filename, self), f"Saving to {filename}")
         except Exception as e:
             QMessageBox.critical(
                 self, "Error", f"Failed to save file: {str(e)}")
@@ -202,19 +306,199 @@ class TodoView(QMainWindow):
             )
 
             if filename:
+                self.show_model()
+                if self.database is not None:
+                    # Loading replaces the tasks in the list, which must not delete them from the database
+                    self.close_storage()
+                    self.setWindowTitle(self.storage_title())
+                worker = LoadWorker(filename, parent=self)
+                worker.loaded.connect(self.receive_items)
+                self.previous_items = self.model.getItems()
                 self.model.clear()
+                self.start_file_operation(worker, f"Loading {filename}")
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Error", f"Failed to load file: {str(e)}")
 
-                items = FileHandler.load_json(filename)
-                for item in items:
-                    self.model.addItem(item)
-                    if item.category not in [self.category_input.itemText(i) for i in range(self.category_input.count())]:
-                        self.category_input.addItem(item.category)
+    def start_file_operation(self, worker: FileWorker, message: str):
+        """Run a load or save in the background, showing its progress."""
+        self.file_worker = worker
+        worker.progress.connect(self.progress_bar.setValue)
+        worker.finished.connect(self.file_operation_finished)
+        self.set_busy(True)
+        self.statusBar().showMessage(message)
+        worker.start()
+
+    def set_busy(self, busy: bool):
+        """Show or hide the progress of a file operation and block conflicting edits."""
+        for widget in self.busy_widgets:
+            widget.setEnabled(not busy)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(busy)
+        self.cancel_button.setVisible(busy)
+
+    def receive_items(self, items: List[TodoItem]):
+        """Show tasks read so far by a running load."""
+        if self.file_worker is None or self.file_worker.isInterruptionRequested():
+            return
+        self.model.addItems(items)
+        self.add_categories({item.category for item in items})
+
+    def cancel_file_operation(self):
+        """Stop the running load or save after its current chunk."""
+        if self.file_worker is not None:
+            self.file_worker.requestInterruption()
+            self.statusBar().showMessage("Cancelling...")
+
+    def file_operation_finished(self):
+        """Report how a load or save ended; restore the old tasks if a load did not complete."""
+        worker = self.file_worker
+        self.file_worker = None
+        worker.wait()
+        worker.deleteLater()
+        self.set_busy(False)
+        self.statusBar().clearMessage()
+
+        loading = isinstance(worker, LoadWorker)
+        if loading and not worker.completed:
+            self.model.setItems(self.previous_items)
+        self.previous_items = []
+
+        if worker.completed:
+            QMessageBox.information(
+                self, "Success",
+                f"Tasks loaded from {worker.filename}" if loading else f"Tasks saved to {worker.filename}")
+        elif worker.error is not None:
+            QMessageBox.critical(
+                self, "Error",
+                f"Failed to {'load' if loading else 'save'} file: {worker.error}")
+        else:
+            self.statusBar().showMessage("Loading cancelled" if loading else "Saving cancelled", 5000)
+
+    def closeEvent(self, event):
+        """Stop a running load or save and close the journal before the window closes."""
+        if self.file_worker is not None:
+            self.file_worker.requestInterruption()
+            self.file_worker.wait()
+        self.close_storage()
+        super().closeEvent(event)
+
+    def open_journal(self):
+        """Save every change to a journal file, loading the tasks in it if it exists."""
+        try:
+            filename, _ = QFileDialog.getSaveFileName(
+                self,
+                "Open Journal",
+                "",
+                "Todo Journals (*.todo)",
+                options=QFileDialog.Option.DontConfirmOverwrite
+            )
 
-                QMessageBox.information(
-                    self, "Success", f"Tasks loaded from {filename}")
+            if filename:
+                self.show_model()
+                self.close_storage()
+                self.journal = TodoJournal(self.model, filename)
+                # Queued, so no dialog opens while the model is in the middle of a change
+                self.journal.failed.connect(self.storage_failed, Qt.ConnectionType.QueuedConnection)
+                self.add_categories(self.model.getCategories())
+                self.setWindowTitle(f"Todo List - {filename}")
         except Exception as e:
             QMessageBox.critical(
-                self, "Error", f"Failed to load file: {str(e)}")
+                self, "Error", f"Failed to open journal: {str(e)}")
+
+    def open_database(self):
+        """Show and save tasks in an SQLite database, which is created with the current tasks if new."""
+        try:
+            filename, _ = QFileDialog.getSaveFileName(
+                self,
+                "Open Database",
+                "",
+                f"SQLite Databases (*{SQLITE_EXTENSION})",
+                options=QFileDialog.Option.DontConfirmOverwrite
+            )
+
+            if filename:
+                self.show_model()
+                self.close_storage()
+                created = not os.path.exists(filename)
+                database = TodoDatabase(filename)
+                if created:
+                    database.insert(self.model.getItems())
+                self.add_categories(database.categories())
+                self.database = TodoDatabaseAdapter(self.model, database)
+                # Queued like the journal's
+                self.database.failed.connect(self.storage_failed, Qt.ConnectionType.QueuedConnection)
+                self.apply_filter()
+                self.setWindowTitle(f"Todo List - {filename}")
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Error", f"Failed to open database: {str(e)}")
+
+    def storage_failed(self, message: str):
+        """Report that a change could not be saved to the open journal or database."""
+        QMessageBox.critical(self, "Error", f"Failed to save changes: {message}")
+
+    def close_storage(self):
+        """Close the open journal or database, if any."""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if self.database is not None:
+            self.database.close()
+            self.database.database.close()
+            self.database = None
+            self.tree_view.header().setSortIndicatorShown(False)
+
+    def browse_file(self):
+        """Show a JSON or binary file read-only, reading tasks only as they are scrolled into view."""
+        try:
+            filename, _ = QFileDialog.getOpenFileName(
+                self,
+                "Browse File",
+                "",
+                f"Todo Files (*.json *{BINARY_EXTENSION});;JSON Files (*.json);;"
+                f"Binary Todo Files (*{BINARY_EXTENSION})"
+            )
+
+            if filename:
+                if filename.lower().endswith(BINARY_EXTENSION):
+                    store = BinaryStore(filename)
+                else:
+                    store = JsonArrayStore(filename)
+                self.show_model()
+                self.browse_store = store
+                self.tree_view.setModel(LazyTodoModel(store, parent=self))
+                self.setWindowTitle(f"Todo List - {filename} (read-only)")
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Error", f"Failed to open file: {str(e)}")
+
+    def is_browsing(self) -> bool:
+        """Tell the user and return True if a read-only file is shown."""
+        if self.browse_store is None:
+            return False
+        QMessageBox.information(
+            self, "Read-only", "The browsed file is read-only. Load it to edit tasks.")
+        return True
+
+    def show_model(self):
+        """Stop browsing a file and show the editable tasks again."""
+        if self.browse_store is None:
+            return
+        browsed = self.tree_view.model()
+        self.tree_view.setModel(self.proxy)
+        browsed.deleteLater()
+        self.browse_store.close()
+        self.browse_store = None
+        self.setWindowTitle(self.storage_title())
+
+    def storage_title(self) -> str:
+        """Return the window title naming the open journal or database."""
+        if self.journal is not None:
+            return f"Todo List - {self.journal.filename}"
+        if self.database is not None:
+            return f"Todo List - {self.database.database.filename}"
+        return "Todo List - JSON File Handling"
 
 
 def main():
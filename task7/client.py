@@ -1,7 +1,10 @@
+import json
 import socket
+import sys
+from typing import Iterable, List, Optional, Union
 
-HOST = '127.0.0.1'  
-PORT = 65432        
+HOST = '127.0.0.1'
+PORT = 65432
 
 
 def main():
@@ -15,5 +18,107 @@ def main():
             print("Reply from server:", data.decode())
 
 
+class CalculationError(ValueError):
+    """Error reported by the calculator service for one request."""
+
+
+class CalculatorClient:
+    """Client of the calculator service started with 'server.py --calc'.
+
+    Variables assigned through one client persist until it is closed and
+    are not visible to other clients.
+    """
+
+    def __init__(self, host: str = HOST, port: int = PORT, timeout: Optional[float] = None):
+        self.socket = socket.create_connection((host, port), timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.responses = self.socket.makefile('rb')
+        self.next_id = 0
+
+    def close(self) -> None:
+        self.responses.close()
+        self.socket.close()
+
+    def __enter__(self) -> "CalculatorClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def evaluate(self, expression: str) -> Optional[float]:
+        """Evaluate an expression and return the result of its last statement.
+
+        Raises:
+            CalculationError: If the server could not evaluate the expression.
+        """
+        result = self.evaluate_many([expression])[0]
+        if isinstance(result, CalculationError):
+            raise result
+        return result
+
+    def evaluate_many(self, expressions: Iterable[str], batch_size: int = 256
+                      ) -> List[Union[Optional[float], CalculationError]]:
+        """Evaluate expressions in order, sending batch_size requests per round trip.
+
+        A failing expression yields a CalculationError in its place instead
+        of stopping the batch; later expressions are still evaluated.
+
+        Args:
+            expressions: Expressions, each possibly with several ';'-separated statements.
+            batch_size: Number of requests written before reading their responses.
+                It bounds the data in flight, so neither side blocks on full buffers.
+
+        Returns:
+            List[Union[Optional[float], CalculationError]]: One result per expression.
+        """
+        results: List[Union[Optional[float], CalculationError]] = []
+        batch: List[bytes] = []
+        for expression in expressions:
+            batch.append(json.dumps({'id': self.next_id, 'expr': expression}).encode() + b"\n")
+            self.next_id += 1
+            if len(batch) >= batch_size:
+                results.extend(self.send(batch))
+                batch = []
+        if batch:
+            results.extend(self.send(batch))
+        return results
+
+    def send(self, batch: List[bytes]) -> List[Union[Optional[float], CalculationError]]:
+        """Send framed requests in one write and read their responses."""
+        self.socket.sendall(b"".join(batch))
+        results: List[Union[Optional[float], CalculationError]] = []
+        for _ in batch:
+            line = self.responses.readline()
+            if not line:
+                raise ConnectionError("Calculator service closed the connection")
+            response = json.loads(line)
+            if 'error' in response:
+                results.append(CalculationError(response['error']))
+            else:
+                results.append(response['value'])
+        return results
+
+
+def calculator_main() -> None:
+    """Send expressions typed by the user to the calculator service."""
+    with CalculatorClient() as client:
+        print(f"Connected to calculator service {HOST}:{PORT}")
+        print("Enter 'q' to quit")
+        while True:
+            try:
+                expression = input("\nEnter expression: ")
+            except EOFError:
+                break
+            if expression.lower() == 'q':
+                break
+            try:
+                print(f"Result: {client.evaluate(expression)}")
+            except CalculationError as e:
+                print(f"Error: {e}")
+
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--calc":
+        calculator_main()
+    else:
+        main()
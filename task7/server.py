@@ -1,7 +1,21 @@
+import asyncio
+import json
+import os
 import socket
+import sys
+from typing import List, Optional
 
-HOST = '127.0.0.1'  
-PORT = 65432       
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'task2'))
+
+from advanced_calc import Calculator, ParseCache, Parser  # noqa: E402
+
+HOST = '127.0.0.1'
+PORT = 65432
+
+# Longest request line accepted from a client, in bytes
+MAX_LINE = 1 << 20
+
+READ_SIZE = 1 << 16
 
 
 def main():
@@ -21,5 +35,75 @@ def main():
                 conn.sendall(response.encode())
 
 
+def process_request(calculator: Calculator, line: bytes) -> bytes:
+    """Evaluate one request line and return the response line.
+
+    A request is a JSON object {"id": ..., "expr": "..."} where expr may hold
+    several statements separated by ';'. The response echoes the id and holds
+    either "value", the result of the last statement, or "error".
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict) or not isinstance(request.get('expr'), str):
+            raise ValueError("Request must be an object with a string 'expr'")
+        request_id = request.get('id')
+        statements = [expr.strip() for expr in request['expr'].split(';') if expr.strip()]
+        response = {'id': request_id, 'value': calculator.evaluate_statements(statements)}
+    except Exception as e:
+        response = {'id': request_id, 'error': str(e)}
+    return json.dumps(response).encode() + b"\n"
+
+
+async def handle_calculator_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                   parse_cache: ParseCache) -> None:
+    """Serve one connection with its own variables until the client disconnects.
+
+    Requests are newline-delimited; all complete requests received in one
+    read are answered with a single write, so pipelined requests cost one
+    round trip per batch.
+    """
+    calculator = Calculator(parse_cache=parse_cache)
+    pending = b""
+    try:
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+            lines = (pending + data).split(b"\n")
+            pending = lines.pop()
+            if len(pending) > MAX_LINE:
+                writer.write(json.dumps({'id': None, 'error': "Request too long"}).encode() + b"\n")
+                break
+            responses: List[bytes] = [process_request(calculator, line)
+                                      for line in lines if line.strip()]
+            if responses:
+                writer.write(b"".join(responses))
+                await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_calculator(host: str = HOST, port: int = PORT,
+                           parse_cache: Optional[ParseCache] = None) -> None:
+    """Accept calculator clients until cancelled."""
+    if parse_cache is None:
+        parse_cache = ParseCache(Parser(), maxsize=4096)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_calculator_client(reader, writer, parse_cache),
+        host, port, backlog=1024)
+    print(f"Calculator service is listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--calc":
+        try:
+            asyncio.run(serve_calculator())
+        except KeyboardInterrupt:
+            pass
+    else:
+        main()